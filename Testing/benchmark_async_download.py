@@ -0,0 +1,153 @@
+"""
+Benchmark: latency of other API routes while a large repository is downloaded.
+
+A local stub stands in for the GitHub API and serves a synthetic zipball at a
+throttled rate. While the download runs, a probe keeps calling a `/ping` route
+on a FastAPI app living in the same event loop (the same situation as the
+webhook coroutine sharing the loop with the UI API). The probe latency is
+reported for an idle loop, and for the path generation runs take:
+`download_github_archive` followed by `iter_archive_file` in a worker thread,
+once with the archive parsed on the loop instead for comparison.
+
+Usage (from the repository root):
+    python Testing/benchmark_async_download.py [--files 3000] [--file-kb 16] [--mbps 80]
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+def build_zipball(file_count, file_kb):
+    """Build a GitHub-style zipball with a single top-level directory"""
+    buffer = io.BytesIO()
+    rng = random.Random(0)
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for i in range(file_count):
+            body = "".join(rng.choice("abcdefghij \n") for _ in range(file_kb * 1024))
+            archive.writestr(f"owner-repo-0000000/pkg{i % 50}/module_{i}.py", f"# module {i}\n{body}")
+    return buffer.getvalue()
+
+
+def start_stub_server(zip_bytes, bytes_per_second):
+    """Serve the repository metadata and a throttled zipball on a random local port"""
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.endswith("/zipball/main"):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/zip")
+                self.send_header("Content-Length", str(len(zip_bytes)))
+                self.end_headers()
+                chunk = 64 * 1024
+                for start in range(0, len(zip_bytes), chunk):
+                    self.wfile.write(zip_bytes[start:start + chunk])
+                    time.sleep(chunk / bytes_per_second)
+            else:
+                body = b'{"full_name": "owner/repo"}'
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def probe_latency(client, stop_event, samples, interval=0.02):
+    """
+    Call the ping route on a fixed schedule and record latency in ms
+
+    Latency is measured from when the request was due, so time spent waiting
+    for a blocked event loop counts against the route, as it would for a client.
+    """
+    due = time.perf_counter()
+    while not stop_event.is_set():
+        await asyncio.sleep(max(0.0, due - time.perf_counter()))
+        await client.get("/ping")
+        samples.append((time.perf_counter() - due) * 1000)
+        # Requests missed while the loop was blocked are not replayed
+        due = max(due + interval, time.perf_counter())
+
+
+async def run_scenario(name, client, download):
+    samples = []
+    stop_event = asyncio.Event()
+    probe = asyncio.create_task(probe_latency(client, stop_event, samples))
+    await asyncio.sleep(0.2)
+
+    start = time.perf_counter()
+    contents = await download()
+    elapsed = time.perf_counter() - start
+
+    # Let the probe observe the loop after the download finishes
+    await asyncio.sleep(0.2)
+    stop_event.set()
+    await probe
+
+    samples.sort()
+    p50 = statistics.median(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:<28} files={len(contents):<6} download={elapsed:6.2f}s "
+          f"ping p50={p50:7.2f}ms p99={p99:8.2f}ms max={samples[-1]:8.2f}ms n={len(samples)}")
+
+
+async def main(args):
+    zip_bytes = build_zipball(args.files, args.file_kb)
+    server = start_stub_server(zip_bytes, args.mbps * 1024 * 1024 / 8)
+    os.environ["GITHUB_API_URL"] = f"http://127.0.0.1:{server.server_port}"
+    print(f"Synthetic zipball: {len(zip_bytes) / 1024 / 1024:.1f} MiB, {args.files} files")
+
+    import httpx
+    from fastapi import FastAPI
+    from utils import repo as repo_utils
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+        async def idle():
+            await asyncio.sleep(2)
+            return {}
+
+        async def parse_on_loop():
+            with await repo_utils.download_github_archive("owner", "repo", "token") as archive_file:
+                return dict(repo_utils.iter_archive_file(archive_file, {".py"}))
+
+        async def parse_in_thread():
+            with await repo_utils.download_github_archive("owner", "repo", "token") as archive_file:
+                return await asyncio.to_thread(lambda: dict(repo_utils.iter_archive_file(archive_file, {".py"})))
+
+        # One-time lazy imports inside the HTTP clients are not part of steady-state latency
+        await parse_in_thread()
+
+        await run_scenario("idle", client, idle)
+        await run_scenario("download, parse on loop", client, parse_on_loop)
+        await run_scenario("download, parse in thread", client, parse_in_thread)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=3000)
+    parser.add_argument("--file-kb", type=int, default=16)
+    parser.add_argument("--mbps", type=float, default=80.0)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+Benchmark: per-call and whole-run latency of model analysis with hedging off and on.
+
+Two local stubs stand in for Ollama backends. Most generations take 50-80 ms,
+but a small share stall for seconds, as a stuck generation does. The same
+sequence of files is analysed through `analyse_content` with OLLAMA_HEDGE off
+and on, and p50/p99 model call latency (excluding limiter queueing), run time and the extra load from hedges are
+reported.
+
+Usage (from the repository root):
+    python Testing/benchmark_hedging.py [--calls 300] [--stall-rate 0.03] [--stall 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+
+async def start_backend(rng, stall_rate, stall_seconds, served):
+    """Serve a stub /api/generate with occasional stalls on a random local port"""
+    from aiohttp import web
+
+    async def generate(request):
+        await request.json()
+        served.append(1)
+        await asyncio.sleep(stall_seconds if rng.random() < stall_rate else rng.uniform(0.05, 0.08))
+        return web.json_response({"response": json.dumps({"endpoints": []})})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    app.router.add_get("/api/tags", lambda request: web.json_response({"models": []}))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/api/generate"
+
+
+async def main(args):
+    rng = random.Random(0)
+    served = []
+    backends = [await start_backend(rng, args.stall_rate, args.stall, served) for _ in range(2)]
+    os.environ["OLLAMA_URL"] = ",".join(url for _, url in backends)
+    os.environ["OLLAMA_MAX_CONCURRENCY"] = "4"
+
+    # The backend keeps its SQLite files under ./backend/database
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("backend/database")
+    import aiohttp
+    from routes import assistant
+    from utils.hedging import Hedger, percentile
+
+    contents = [f"@app.get('/items/{i}')\ndef item_{i}():\n    return {{}}\n" * 20 for i in range(args.calls)]
+
+    async with aiohttp.ClientSession() as session:
+        for hedge in (False, True):
+            assistant.OLLAMA_HEDGE = hedge
+            assistant.ollama_hedger = Hedger(percentile=args.percentile, max_ratio=args.max_ratio)
+            rng.seed(1)
+            served.clear()
+            latencies = []
+
+            async def analyse(content):
+                # Time spent in the model call itself, without waiting for a limiter slot
+                await assistant.analyse_content(session, assistant.ollama_limiter, content, latencies)
+
+            started = time.monotonic()
+            await asyncio.gather(*(analyse(content) for content in contents))
+            run_time = time.monotonic() - started
+
+            stats = assistant.ollama_hedger.stats()
+            print(f"hedging {'on ' if hedge else 'off'}  call p50={statistics.median(latencies) * 1000:7.1f}ms "
+                  f"p99={percentile(latencies, 0.99) * 1000:7.1f}ms max={max(latencies) * 1000:7.1f}ms "
+                  f"run={run_time:6.2f}s requests={len(served)} hedges={stats['hedges']} "
+                  f"hedge wins={stats['hedge_wins']} skipped={stats['skipped_for_budget']} extra load={len(served) / len(contents) - 1:5.1%}")
+
+    for runner, _ in backends:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--stall-rate", type=float, default=0.03)
+    parser.add_argument("--stall", type=float, default=3.0)
+    parser.add_argument("--percentile", type=float, default=0.95)
+    parser.add_argument("--max-ratio", type=float, default=0.1)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,115 @@
+"""
+Benchmark: tokens Ollama has to process per file under each request profile.
+
+A local stub stands in for Ollama's /api/generate and accounts for tokens the
+way a single llama.cpp slot does: the longest common prefix with the previous
+request is served from the KV cache and only the rest is evaluated, inputs
+beyond num_ctx (2048 by default) are truncated, and generation stops at
+num_predict. Output lengths are drawn from the same long-tailed distribution for
+every profile, so only the cap changes them. The backend's own source files are
+sent through `process_with_ollama` once per profile.
+
+Usage (from the repository root):
+    python Testing/benchmark_ollama_profiles.py [--profiles legacy,structured,fast] [--files 40]
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+
+DEFAULT_NUM_CTX = 2048
+
+
+def tokens(text):
+    return len(text) // 4 + 1
+
+
+def start_stub(usage):
+    """Serve a token-accounting /api/generate on a random local port"""
+    from aiohttp import web
+
+    state = {"kv_cache": ""}
+
+    async def generate(request):
+        body = await request.json()
+        system = body.get("system")
+        full = f"{system}\n\n{body['prompt']}" if system else body["prompt"]
+        options = body.get("options", {})
+        num_ctx = options.get("num_ctx", DEFAULT_NUM_CTX)
+
+        cached = len(os.path.commonprefix([state["kv_cache"], full]))
+        evaluated = tokens(full) - (tokens(full[:cached]) if cached else 0)
+        truncated = tokens(full) > num_ctx
+
+        rng = random.Random(hashlib.sha256(body["prompt"].encode()).digest())
+        wanted = int(120 + rng.expovariate(1 / 450))
+        generated = min(wanted, options.get("num_predict", num_ctx))
+        state["kv_cache"] = full + "x" * (generated * 4)
+
+        usage.append({"prompt_eval_count": min(evaluated, num_ctx), "eval_count": generated, "num_ctx": num_ctx,
+                      "truncated": truncated, "keep_alive": "keep_alive" in body})
+        return web.json_response({"response": json.dumps({"endpoints": []}),
+                                  "prompt_eval_count": min(evaluated, num_ctx), "eval_count": generated})
+
+    return web, generate
+
+
+async def main(args):
+    usage = []
+    web, generate = start_stub(usage)
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    os.environ["OLLAMA_URL"] = f"http://127.0.0.1:{port}/api/generate"
+
+    sources = sorted(glob.glob(os.path.join(BACKEND, "**", "*.py"), recursive=True))[:args.files]
+    contents = [open(path, encoding="utf-8").read() for path in sources]
+
+    # The backend keeps its SQLite files under ./backend/database
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("backend/database")
+    import aiohttp
+    from routes import assistant
+    from utils.chunker import chunk_source
+    from utils.ollama_profiles import get_profile
+
+    chunks = [chunk for content in contents for chunk in chunk_source(content, assistant.OLLAMA_CHUNK_TOKENS)]
+    print(f"{len(sources)} files, {len(chunks)} model calls per profile")
+
+    async with aiohttp.ClientSession() as session:
+        for name in args.profiles.split(","):
+            assistant.OLLAMA_REQUEST_PROFILE = get_profile(name)
+            usage.clear()
+            for chunk in chunks:
+                await assistant.process_with_ollama(session, chunk)
+
+            prompt_tokens = [call["prompt_eval_count"] for call in usage]
+            output_tokens = [call["eval_count"] for call in usage]
+            print(f"{name:<11} prompt tokens/call={statistics.mean(prompt_tokens):7.1f} "
+                  f"output tokens/call={statistics.mean(output_tokens):6.1f} (max {max(output_tokens):5d}) "
+                  f"total={sum(prompt_tokens) + sum(output_tokens):7d} "
+                  f"num_ctx avg={statistics.mean(call['num_ctx'] for call in usage):6.0f} "
+                  f"truncated={sum(call['truncated'] for call in usage):3d} "
+                  f"keep_alive={'yes' if all(call['keep_alive'] for call in usage) else 'no'}")
+
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", default="legacy,structured,fast")
+    parser.add_argument("--files", type=int, default=40)
+    asyncio.run(main(parser.parse_args()))
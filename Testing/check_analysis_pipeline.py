@@ -0,0 +1,82 @@
+"""
+Check: every file the analysis pipeline accepts comes back with a result.
+
+A local stub stands in for Ollama. Small files are fed through
+`run_analysis_pipeline` from a slow iterator, so the end-of-input marker
+arrives while the model stage is idle and small files are still waiting in an
+unsent batch. Each case asserts that every file gets a result and that the
+expected number of model calls was made.
+
+Usage (from the repository root):
+    python Testing/check_analysis_pipeline.py
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+SMALL_FILE = "const express = require('express');\nconst app = express();\napp.get('/items/{n}', (req, res) => res.json([]));\n"
+
+
+async def start_backend(calls):
+    """Serve a stub /api/generate that answers single-file and batch prompts"""
+    from aiohttp import web
+
+    async def generate(request):
+        body = await request.json()
+        calls.append(body)
+        endpoints = {"endpoints": [{"path": "/items", "method": "GET"}]}
+        paths = [line.strip()[len("===== FILE: "):-len(" =====")] for line in body["prompt"].splitlines()
+                 if line.strip().startswith("===== FILE: ")]
+        if paths:
+            return web.json_response({"response": json.dumps({"files": {path: endpoints for path in paths}})})
+        return web.json_response({"response": json.dumps(endpoints)})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    app.router.add_get("/api/tags", lambda request: web.json_response({"models": []}))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}/api/generate"
+
+
+def slow_source(names, delay=0.2):
+    """Yield small files slowly, so the model stage drains before the next one arrives"""
+    for name in names:
+        time.sleep(delay)
+        yield name, {"path": name, "content": SMALL_FILE.replace("{n}", name), "size": len(SMALL_FILE)}
+
+
+async def main():
+    calls = []
+    runner, url = await start_backend(calls)
+    os.environ["OLLAMA_URL"] = url
+
+    # The backend keeps its SQLite files under ./backend/database
+    os.chdir(tempfile.mkdtemp())
+    os.makedirs("backend/database")
+    from routes import assistant
+
+    failures = 0
+    for names in (["c.js"], ["a.js", "b.js"], ["d.js", "e.js", "f.js"]):
+        calls.clear()
+        stats = {}
+        results = await assistant.run_analysis_pipeline(slow_source(names), stats)
+        missing = sorted(set(names) - set(results))
+        ok = not missing and not stats.get("failed_files") and calls
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {len(names)} small file(s): {len(results)} results, "
+              f"{len(calls)} model calls, missing={missing}")
+
+    await runner.cleanup()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
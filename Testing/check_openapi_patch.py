@@ -0,0 +1,113 @@
+"""
+Check: patching a spec for a set of changed files gives the same result as a
+full build.
+
+Starting from a spec built from api_routes.json, random edit sets remove,
+change and add files, including files that declare the same method and path
+as another file or hide one by being first in path order. For every edit set
+the patched spec must equal build_openapi_spec of the edited routes, paths in
+the same order. Patching with nothing changed must give a byte-identical
+YAML document, and descriptions rewritten in the old spec (as Gemini
+enrichment does) must survive on every operation the patch did not replace.
+
+Usage (from the repository root):
+    python Testing/check_openapi_patch.py [--trials 200] [--seed 0]
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+ENRICHED = "Rewritten by enrichment"
+
+
+def random_endpoint(rng, paths):
+    # Reusing known paths makes edits collide with other files' operations
+    path = rng.choice(paths) if paths and rng.random() < 0.5 else f"/generated/{rng.randrange(50)}/{{id}}"
+    return {"path": path, "method": rng.choice(["GET", "POST", "PUT", "DELETE"]),
+            "description": f"Endpoint {rng.randrange(1000)}", "authentication": rng.choice(["", "JWT"])}
+
+
+def edit_routes(rng, api_routes):
+    """Return (edited routes, changed file paths) for a random edit set"""
+    routes = copy.deepcopy(api_routes)
+    paths = [endpoint["path"] for result in routes.values() for endpoint in result.get("endpoints", [])]
+    changed = set()
+    for _ in range(rng.randint(1, 4)):
+        action = rng.choice(["remove", "change", "add"]) if routes else "add"
+        if action == "remove":
+            file_path = rng.choice(sorted(routes))
+            del routes[file_path]
+        elif action == "change":
+            file_path = rng.choice(sorted(routes))
+            endpoints = routes[file_path].setdefault("endpoints", [])
+            if endpoints and rng.random() < 0.5:
+                endpoints.pop(rng.randrange(len(endpoints)))
+            else:
+                endpoints.append(random_endpoint(rng, paths))
+        else:
+            # "0_" sorts before most files, "z_" after: new files both hide and lose duplicates
+            file_path = f"{rng.choice(['0_', 'z_'])}new/{rng.randrange(1000)}.py"
+            routes[file_path] = {"endpoints": [random_endpoint(rng, paths) for _ in range(rng.randint(0, 3))]}
+        changed.add(file_path)
+    return routes, changed
+
+
+def enrich(spec):
+    for path_item in spec["paths"].values():
+        for operation in path_item.values():
+            operation["description"] = ENRICHED
+
+
+def main(args):
+    from utils.openapi import build_openapi_spec, patch_openapi_spec, dump_openapi_yaml
+
+    with open(os.path.join(ROOT, "api_routes.json")) as f:
+        api_routes = json.load(f)
+    rng = random.Random(args.seed)
+    failures = 0
+
+    # Nothing changed: the document must not change by a byte
+    spec = build_openapi_spec(api_routes)
+    before = dump_openapi_yaml(spec)
+    added = patch_openapi_spec(spec, api_routes, set())
+    ok = dump_openapi_yaml(spec) == before and not added
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} no-op patch: {'identical' if ok else f'{len(added)} operations replaced'}")
+
+    mismatches = lost = 0
+    for _ in range(args.trials):
+        routes, changed = edit_routes(rng, api_routes)
+        spec = build_openapi_spec(api_routes)
+        patch_openapi_spec(spec, routes, changed)
+        full = build_openapi_spec(routes)
+        if spec != full or list(spec["paths"]) != list(full["paths"]):
+            mismatches += 1
+
+        enriched = build_openapi_spec(api_routes)
+        enrich(enriched)
+        replaced = set(patch_openapi_spec(enriched, routes, changed))
+        lost += any(operation.get("description") != ENRICHED
+                    for path, path_item in enriched["paths"].items()
+                    for method, operation in path_item.items() if (path, method) not in replaced)
+
+    ok = not mismatches
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} patched == full build: {args.trials - mismatches}/{args.trials} edit sets")
+    ok = not lost
+    failures += not ok
+    print(f"{'ok  ' if ok else 'FAIL'} enrichment kept on operations not replaced: "
+          f"{args.trials - lost}/{args.trials} edit sets")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
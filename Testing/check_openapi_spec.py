@@ -0,0 +1,78 @@
+"""
+Check: specs assembled by build_openapi_spec pass validate_openapi_spec.
+
+The extracted routes in api_routes.json are assembled, together with fixtures
+in the loose shapes model output takes: Express and Flask path parameters,
+undeclared or optional path parameters, body fields listed as parameters,
+odd response codes, authentication and the same method and path in two files.
+Each spec must validate without problems, survive a YAML round trip
+unchanged, and list each duplicated operation once, owned by the first file
+in path order.
+
+Usage (from the repository root):
+    python Testing/check_openapi_spec.py
+"""
+import json
+import os
+import sys
+
+import yaml
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "backend"))
+
+MODEL_STYLE_ROUTES = {
+    "server/users.js": {"endpoints": [
+        {"path": "/users/:id", "method": "get", "parameters": [{"name": "id", "in": "path", "required": False}],
+         "description": "Fetch one user", "authentication": "JWT"},
+        {"path": "users", "method": "POST", "parameters": [{"name": "email", "in": "body", "type": "str"},
+                                                           {"name": "age", "in": "form", "type": "int"}],
+         "response": {"201": {"description": "Created"}, "bad": "ignored"}},
+        {"path": "/users/{id}/posts?page=1", "method": "GET", "parameters": ["page", {"name": "page", "in": "query"}]},
+    ]},
+    "app/routes.py": {"endpoints": [
+        {"path": "/items/<int:item_id>", "method": "DELETE", "parameters": [], "description": ""},
+        {"path": "/users/:id", "method": "GET", "description": "Same as in server/users.js; this file is first in path order"},
+        {"path": "", "method": "GET"},
+        {"path": "/x", "method": "FETCH"},
+        "not an endpoint",
+    ]},
+    "empty.py": {"endpoints": []},
+    "broken.py": {"error": "model returned no JSON"},
+}
+
+
+def check(name, api_routes, expect=None):
+    from utils.openapi import build_openapi_spec, validate_openapi_spec, dump_openapi_yaml
+
+    spec = build_openapi_spec(api_routes)
+    problems = validate_openapi_spec(spec)
+    round_trip = yaml.safe_load(dump_openapi_yaml(spec)) == spec
+    operations = [(path, method) for path, item in spec["paths"].items() for method in item]
+    mismatched = [f"{key}: {spec['paths'][key[0]][key[1]]['x-source-file']} != {owner}"
+                  for key, owner in (expect or {}).items()
+                  if key not in operations or spec["paths"][key[0]][key[1]]["x-source-file"] != owner]
+    ok = not problems and round_trip and not mismatched
+    print(f"{'ok  ' if ok else 'FAIL'} {name}: {len(operations)} operations, {len(problems)} problems, "
+          f"yaml round trip {'ok' if round_trip else 'differs'}")
+    for problem in problems + mismatched:
+        print(f"     {problem}")
+    return ok
+
+
+def main():
+    with open(os.path.join(ROOT, "api_routes.json")) as f:
+        extracted = json.load(f)
+
+    results = [
+        check("api_routes.json", extracted),
+        check("model-style output", MODEL_STYLE_ROUTES,
+              expect={("/users/{id}", "get"): "app/routes.py", ("/items/{item_id}", "delete"): "app/routes.py"}),
+        check("both together", {**extracted, **MODEL_STYLE_ROUTES}),
+        check("nothing extracted", {}),
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Check: the static extractor resolves the Python route forms it supports exactly
+and leaves everything else to the model.
+
+Each fixture is a small source file with either the (method, path) pairs the
+extractor must return, or None when the file has to go to the model because
+its routes cannot be resolved statically (computed paths or prefixes,
+class-based views, registration styles the extractor does not read).
+
+Usage (from the repository root):
+    python Testing/check_static_extractor.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+FIXTURES = [
+    ("fastapi router with prefix", """
+from fastapi import APIRouter, Depends, Query
+router = APIRouter(prefix="/items")
+
+@router.get("/{item_id}")
+async def read_item(item_id: int, q: str = Query(None)):
+    pass
+
+@router.post("/", status_code=201)
+async def create_item(item: dict, user=Depends(get_current_user)):
+    pass
+""", [("GET", "/items/{item_id}"), ("POST", "/items/")]),
+
+    ("fastapi app with api_route", """
+from fastapi import FastAPI
+app = FastAPI()
+
+@app.api_route("/ping", methods=["GET", "POST"])
+def ping():
+    pass
+""", [("GET", "/ping"), ("POST", "/ping")]),
+
+    ("flask blueprint", """
+from flask import Blueprint, request
+bp = Blueprint("users", __name__, url_prefix="/users")
+
+@bp.route("/<int:user_id>", methods=["GET", "DELETE"])
+def user(user_id):
+    return request.args.get("fields")
+
+def search():
+    pass
+
+bp.add_url_rule("/search", view_func=search)
+""", [("GET", "/users/{user_id}"), ("DELETE", "/users/{user_id}"), ("GET", "/users/search")]),
+
+    ("django function views", """
+from django.urls import path, include
+from django.views.decorators.http import require_http_methods, require_POST
+from . import views
+
+@require_http_methods(["GET", "PUT"])
+def article(request, pk):
+    pass
+
+@require_POST
+def publish(request, pk):
+    pass
+
+urlpatterns = [
+    path("articles/<int:pk>/", article),
+    path("articles/<int:pk>/publish/", publish),
+    path("api/", include("api.urls")),
+]
+""", [("GET", "/articles/{pk}/"), ("PUT", "/articles/{pk}/"), ("POST", "/articles/{pk}/publish/")]),
+
+    ("fastapi computed prefix", """
+from fastapi import APIRouter
+from .config import settings
+router = APIRouter(prefix=settings.API_PREFIX)
+
+@router.get("/a")
+def a():
+    pass
+""", None),
+
+    ("flask f-string prefix", """
+from flask import Blueprint
+VERSION = 2
+bp = Blueprint("v", __name__, url_prefix=f"/v{VERSION}")
+
+@bp.route("/a")
+def a():
+    pass
+""", None),
+
+    ("computed route path", """
+from fastapi import FastAPI
+from .paths import USERS
+app = FastAPI()
+
+@app.get(USERS)
+def users():
+    pass
+""", None),
+
+    ("django class-based view", """
+from django.urls import path
+from . import views
+
+urlpatterns = [path("items/", views.ItemList.as_view())]
+""", None),
+
+    ("aiohttp route table", """
+from aiohttp import web
+
+async def handle(request):
+    pass
+
+app = web.Application()
+app.add_routes([web.get("/", handle)])
+""", None),
+
+    ("drf router", """
+from rest_framework import routers
+from .views import UserViewSet
+router = routers.DefaultRouter()
+router.register(r"users", UserViewSet)
+""", None),
+
+    ("no routes", """
+def helper(values):
+    return {"total": sum(values)}
+""", []),
+]
+
+
+def main():
+    from utils.static_extractor import extract_static_endpoints
+
+    failures = 0
+    for name, source, expected in FIXTURES:
+        result = extract_static_endpoints("fixture.py", source)
+        got = None if result is None else sorted((endpoint["method"], endpoint["path"]) for endpoint in result["endpoints"])
+        want = None if expected is None else sorted(expected)
+        ok = got == want
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {'model' if got is None else got}"
+              + ("" if ok else f" (expected {'model' if want is None else want})"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
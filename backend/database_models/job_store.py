@@ -0,0 +1,200 @@
+from sqlalchemy import Boolean, Column, Float, Integer, String, Text, create_engine, func, or_, update
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker, Session
+import json
+import os
+import time
+
+from utils.scheduler import merge_changes
+
+DATABASE_URL = "sqlite:///./backend/database/jobs.db"
+
+# Jobs whose lease was lost this many times (worker crashes) are given up
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+
+engine = create_engine(DATABASE_URL, connect_args={"timeout": 30})
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+
+class GenerationJob(Base):
+    """
+    A documentation generation request waiting for, or leased by, a worker process
+
+    Only the GitHub user id is stored; the worker reads the current token when it
+    runs the job.
+    """
+    __tablename__ = "generation_jobs"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    owner = Column(String, index=True)
+    repo = Column(String, index=True)
+    branch = Column(String)
+    owner_id = Column(String)
+    ref = Column(String)
+    changes = Column(Text)
+    status = Column(String, index=True, default="queued")  # queued, running, done, failed, superseded
+    superseded = Column(Boolean, default=False)
+    attempts = Column(Integer, default=0)
+    lease_owner = Column(String, nullable=True)
+    lease_expires = Column(Float, nullable=True)
+    created_at = Column(Float)
+    updated_at = Column(Float)
+    result = Column(Text, nullable=True)
+
+Base.metadata.create_all(bind=engine)
+
+
+def job_key_filter(owner, repo, branch):
+    return (GenerationJob.owner == owner) & (GenerationJob.repo == repo) & (GenerationJob.branch == branch)
+
+
+def enqueue_job(owner: str, repo: str, branch: str, owner_id: str, ref: str, changes, db: Session = None):
+    """
+    Queue a generation run, coalescing with a run already waiting for the same branch
+
+    A running job of the branch is flagged as superseded so its worker stops at
+    the next stage boundary. Returns "queued" or "coalesced".
+    """
+    if not db:
+        db = SessionLocal()
+    now = time.time()
+    waiting = db.query(GenerationJob).filter(job_key_filter(owner, repo, branch),
+                                             GenerationJob.status == "queued").first()
+    if waiting is not None:
+        waiting.changes = json.dumps(merge_changes(json.loads(waiting.changes), changes))
+        waiting.ref = ref
+        waiting.owner_id = owner_id
+        waiting.updated_at = now
+        status = "coalesced"
+    else:
+        db.add(GenerationJob(owner=owner, repo=repo, branch=branch, owner_id=owner_id, ref=ref,
+                             changes=json.dumps(changes), status="queued", created_at=now, updated_at=now))
+        status = "queued"
+
+    db.query(GenerationJob).filter(job_key_filter(owner, repo, branch), GenerationJob.status == "running") \
+        .update({"superseded": True}, synchronize_session=False)
+    db.commit()
+    db.close()
+    return status
+
+
+def claim_job(worker_id: str, lease_seconds: float, db: Session = None):
+    """
+    Lease the oldest runnable job to a worker, or return None
+
+    Jobs whose lease expired (their worker died) are runnable again. A queued job
+    waits while another job of the same branch holds a live lease. Claims are
+    conditional updates, so concurrent workers never lease the same job.
+    """
+    if not db:
+        db = SessionLocal()
+    now = time.time()
+    try:
+        candidates = db.query(GenerationJob).filter(or_(
+            GenerationJob.status == "queued",
+            (GenerationJob.status == "running") & (GenerationJob.lease_expires < now)
+        )).order_by(GenerationJob.id).limit(20).all()
+
+        for job in candidates:
+            if job.attempts >= JOB_MAX_ATTEMPTS:
+                db.query(GenerationJob).filter(GenerationJob.id == job.id, GenerationJob.status == job.status) \
+                    .update({"status": "failed", "result": "Lease lost too many times", "updated_at": now},
+                            synchronize_session=False)
+                db.commit()
+                continue
+            if job.status == "queued":
+                busy = db.query(GenerationJob.id).filter(
+                    job_key_filter(job.owner, job.repo, job.branch),
+                    GenerationJob.status == "running", GenerationJob.lease_expires >= now
+                ).first()
+                if busy is not None:
+                    continue
+
+            claimed = db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.id == job.id, GenerationJob.status == job.status,
+                       func.coalesce(GenerationJob.lease_expires, 0) == (job.lease_expires or 0))
+                .values(status="running", lease_owner=worker_id, lease_expires=now + lease_seconds,
+                        attempts=GenerationJob.attempts + 1, updated_at=now)
+            ).rowcount
+            db.commit()
+            if claimed:
+                db.refresh(job)
+                return {
+                    "id": job.id, "owner": job.owner, "repo": job.repo, "branch": job.branch,
+                    "owner_id": job.owner_id, "ref": job.ref, "changes": json.loads(job.changes),
+                    "attempts": job.attempts,
+                }
+        return None
+    finally:
+        db.close()
+
+
+def heartbeat_job(job_id: int, worker_id: str, lease_seconds: float, db: Session = None):
+    """
+    Extend a job's lease
+
+    Returns (still_leased, superseded); a worker that lost its lease must stop
+    without recording an outcome.
+    """
+    if not db:
+        db = SessionLocal()
+    now = time.time()
+    extended = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id, GenerationJob.lease_owner == worker_id, GenerationJob.status == "running"
+    ).update({"lease_expires": now + lease_seconds, "updated_at": now}, synchronize_session=False)
+    db.commit()
+    job = db.get(GenerationJob, job_id)
+    superseded = bool(job and job.superseded)
+    db.close()
+    return bool(extended), superseded
+
+
+def finish_job(job_id: int, worker_id: str, status: str, result=None, db: Session = None):
+    """Record the outcome of a leased job ("done" or "failed")"""
+    if not db:
+        db = SessionLocal()
+    finished = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id, GenerationJob.lease_owner == worker_id, GenerationJob.status == "running"
+    ).update({"status": status, "result": json.dumps(result, default=str), "lease_expires": None,
+              "updated_at": time.time()}, synchronize_session=False)
+    db.commit()
+    db.close()
+    return bool(finished)
+
+
+def supersede_job(job_id: int, worker_id: str, db: Session = None):
+    """Retire a job that stopped for a newer push, folding its file changes into the queued job"""
+    if not db:
+        db = SessionLocal()
+    job = db.query(GenerationJob).filter(
+        GenerationJob.id == job_id, GenerationJob.lease_owner == worker_id, GenerationJob.status == "running"
+    ).first()
+    if job is None:
+        db.close()
+        return False
+
+    waiting = db.query(GenerationJob).filter(job_key_filter(job.owner, job.repo, job.branch),
+                                             GenerationJob.status == "queued").first()
+    if waiting is not None:
+        waiting.changes = json.dumps(merge_changes(json.loads(job.changes), json.loads(waiting.changes)))
+        job.status = "superseded"
+    else:
+        # Nothing newer to carry the changes: run this job again
+        job.status = "queued"
+        job.superseded = False
+    job.lease_owner = None
+    job.lease_expires = None
+    job.updated_at = time.time()
+    db.commit()
+    db.close()
+    return True
+
+
+def job_stats(db: Session = None):
+    """Number of jobs per status"""
+    if not db:
+        db = SessionLocal()
+    counts = dict(db.query(GenerationJob.status, func.count(GenerationJob.id)).group_by(GenerationJob.status).all())
+    db.close()
+    return counts
@@ -0,0 +1,130 @@
+from sqlalchemy import Column, Float, Integer, String, Text, create_engine, func
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker, Session
+import hashlib
+import json
+import os
+import threading
+import time
+
+DATABASE_URL = "sqlite:///./backend/database/llm_cache.db"
+
+# Total size of cached results (in bytes of JSON) kept before the least recently used are evicted
+MAX_CACHE_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+# Eviction frees space down to this share of the budget at once, so it does not run on every write
+EVICT_TO_FRACTION = float(os.getenv("LLM_CACHE_EVICT_TO", 0.9))
+
+# Seconds between updates of an entry's last use, so most hits are a plain read without a commit
+TOUCH_INTERVAL = float(os.getenv("LLM_CACHE_TOUCH_INTERVAL", 3600))
+
+engine = create_engine(DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+# Process-wide counters, exposed for monitoring
+CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+# Running total of cached bytes, read from the table once per process and kept up to date by writes.
+# The cache is called from worker threads, so updates hold the lock.
+_total_bytes = None
+_total_lock = threading.Lock()
+
+
+class CachedResult(Base):
+    """Parsed endpoint JSON of a file content, for one prompt version and model"""
+    __tablename__ = "llm_results"
+    content_hash = Column(String, primary_key=True)
+    prompt_version = Column(String, primary_key=True)
+    model = Column(String, primary_key=True)
+    result = Column(Text)
+    size = Column(Integer)
+    last_used = Column(Float, index=True)
+
+Base.metadata.create_all(bind=engine)
+
+
+def hash_content(content: str):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def get_cached_result(content_hash: str, prompt_version: str, model: str, db: Session = None):
+    """
+    Return the cached result for a file content, or None on a miss
+
+    Blocking: call it from a worker thread (asyncio.to_thread) in async code.
+    """
+    if not db:
+        db = SessionLocal()
+    entry = db.get(CachedResult, (content_hash, prompt_version, model))
+    if entry is None:
+        CACHE_STATS["misses"] += 1
+        db.close()
+        return None
+
+    CACHE_STATS["hits"] += 1
+    result = json.loads(entry.result)
+    now = time.time()
+    if now - entry.last_used > TOUCH_INTERVAL:
+        entry.last_used = now
+        db.commit()
+    db.close()
+    return result
+
+
+def put_cached_result(content_hash: str, prompt_version: str, model: str, result, db: Session = None):
+    """
+    Store a result and evict least recently used entries beyond the size budget
+
+    Blocking: call it from a worker thread (asyncio.to_thread) in async code.
+    """
+    global _total_bytes
+    if not db:
+        db = SessionLocal()
+    serialized = json.dumps(result)
+    previous = db.get(CachedResult, (content_hash, prompt_version, model))
+    previous_size = previous.size if previous is not None else 0
+    db.merge(CachedResult(content_hash=content_hash, prompt_version=prompt_version, model=model,
+                          result=serialized, size=len(serialized), last_used=time.time()))
+    db.commit()
+
+    with _total_lock:
+        if _total_bytes is None:
+            _total_bytes = db.query(func.coalesce(func.sum(CachedResult.size), 0)).scalar()
+        else:
+            _total_bytes += len(serialized) - previous_size
+        if _total_bytes > MAX_CACHE_BYTES:
+            evict(db)
+    db.close()
+
+
+def evict(db: Session):
+    """Delete the least recently used entries down to EVICT_TO_FRACTION of the budget in one statement"""
+    global _total_bytes
+    # Other processes share the table: start from its real size
+    total = db.query(func.coalesce(func.sum(CachedResult.size), 0)).scalar()
+    target = MAX_CACHE_BYTES * EVICT_TO_FRACTION
+    freed, cutoff = 0, None
+    entries = db.query(CachedResult.size, CachedResult.last_used).order_by(CachedResult.last_used).yield_per(1000)
+    for size, last_used in entries:
+        if total - freed <= target:
+            break
+        freed += size
+        cutoff = last_used
+    if cutoff is None:
+        _total_bytes = total
+        return
+    CACHE_STATS["evictions"] += db.query(CachedResult).filter(CachedResult.last_used <= cutoff).delete(
+        synchronize_session=False)
+    db.commit()
+    _total_bytes = db.query(func.coalesce(func.sum(CachedResult.size), 0)).scalar()
+
+
+def cache_stats(db: Session = None):
+    """Counters plus current entry count and size"""
+    if not db:
+        db = SessionLocal()
+    entries, size = db.query(func.count(CachedResult.content_hash),
+                             func.coalesce(func.sum(CachedResult.size), 0)).one()
+    db.close()
+    return {**CACHE_STATS, "entries": entries, "bytes": size, "max_bytes": MAX_CACHE_BYTES}
@@ -0,0 +1,104 @@
+from sqlalchemy import Column, Float, String, Text, create_engine
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import sessionmaker, Session
+import json
+
+DATABASE_URL = "sqlite:///./backend/database/results.db"
+
+engine = create_engine(DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+
+class FileResult(Base):
+    """Endpoint analysis result of a single source file, as produced by process_file"""
+    __tablename__ = "file_results"
+    owner = Column(String, primary_key=True)
+    repo = Column(String, primary_key=True)
+    branch = Column(String, primary_key=True)
+    file_path = Column(String, primary_key=True)
+    result = Column(Text)
+
+class FileLatency(Base):
+    """Model time spent on a file in its last analysis, used to order the next run longest first"""
+    __tablename__ = "file_latencies"
+    owner = Column(String, primary_key=True)
+    repo = Column(String, primary_key=True)
+    branch = Column(String, primary_key=True)
+    file_path = Column(String, primary_key=True)
+    seconds = Column(Float)
+
+Base.metadata.create_all(bind=engine)
+
+
+def read_results(owner: str, repo: str, branch: str, db: Session = None):
+    """Return the stored {file_path: result} mapping of a repository branch"""
+    if not db:
+        db = SessionLocal()
+    rows = db.query(FileResult).filter(
+        FileResult.owner == owner, FileResult.repo == repo, FileResult.branch == branch
+    ).all()
+    db.close()
+    return {row.file_path: json.loads(row.result) for row in rows}
+
+
+def save_results(owner: str, repo: str, branch: str, results: dict, db: Session = None):
+    """Insert or overwrite the stored results of the given files"""
+    if not db:
+        db = SessionLocal()
+    for file_path, result in results.items():
+        db.merge(FileResult(owner=owner, repo=repo, branch=branch,
+                            file_path=file_path, result=json.dumps(result)))
+    db.commit()
+    db.close()
+    print(f"Saved {len(results)} file results for {owner}/{repo}@{branch}")
+
+
+def delete_results(owner: str, repo: str, branch: str, file_paths, db: Session = None):
+    """Drop the stored results of the given files"""
+    if not db:
+        db = SessionLocal()
+    file_paths = list(file_paths)
+    if file_paths:
+        db.query(FileResult).filter(
+            FileResult.owner == owner, FileResult.repo == repo, FileResult.branch == branch,
+            FileResult.file_path.in_(file_paths)
+        ).delete(synchronize_session=False)
+        db.query(FileLatency).filter(
+            FileLatency.owner == owner, FileLatency.repo == repo, FileLatency.branch == branch,
+            FileLatency.file_path.in_(file_paths)
+        ).delete(synchronize_session=False)
+        db.commit()
+    db.close()
+
+
+def replace_results(owner: str, repo: str, branch: str, results: dict, db: Session = None):
+    """Replace every stored result of a repository branch after a full run"""
+    if not db:
+        db = SessionLocal()
+    db.query(FileResult).filter(
+        FileResult.owner == owner, FileResult.repo == repo, FileResult.branch == branch
+    ).delete(synchronize_session=False)
+    db.commit()
+    save_results(owner, repo, branch, results, db)
+
+
+def read_latencies(owner: str, repo: str, branch: str, db: Session = None):
+    """Return the recorded {file_path: seconds} of a repository branch"""
+    if not db:
+        db = SessionLocal()
+    rows = db.query(FileLatency).filter(
+        FileLatency.owner == owner, FileLatency.repo == repo, FileLatency.branch == branch
+    ).all()
+    db.close()
+    return {row.file_path: row.seconds for row in rows}
+
+
+def save_latencies(owner: str, repo: str, branch: str, latencies: dict, db: Session = None):
+    """Insert or overwrite the recorded model time of the given files"""
+    if not db:
+        db = SessionLocal()
+    for file_path, seconds in latencies.items():
+        db.merge(FileLatency(owner=owner, repo=repo, branch=branch, file_path=file_path, seconds=seconds))
+    db.commit()
+    db.close()
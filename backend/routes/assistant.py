@@ -1,4 +1,19 @@
-from utils.repo import get_github_repo_contents
+from utils.repo import download_github_archive, iter_archive_file, fetch_github_files
+from utils.publisher import publish_files
+from utils.github_client import response_cache, rate_limiter, github_priority, BACKGROUND
+from database_models.results_store import read_results, save_results, delete_results, replace_results, read_latencies, save_latencies
+from database_models.llm_cache import hash_content, get_cached_result, put_cached_result, cache_stats
+from database_models.job_store import job_stats
+from utils.static_extractor import extract_static_endpoints
+from utils.route_signatures import has_route_signature
+from utils.chunker import chunk_source, merge_endpoint_results, estimate_tokens
+from utils.concurrency import AdaptiveLimiter, current_flow
+from utils.model_pool import ModelPool
+from utils.hedging import Hedger
+from utils.circuit_breaker import CircuitBreaker
+from utils.ollama_profiles import get_profile, build_request, input_tokens, ANALYSE_SYSTEM_PROMPT, BATCH_SYSTEM_PROMPT, ENDPOINT_SCHEMA, BATCH_SCHEMA
+from utils.scheduler import CoalescingScheduler, raise_if_superseded
+from utils.openapi import build_openapi_spec, patch_openapi_spec, is_patchable_spec, validate_openapi_spec, dump_openapi_yaml
 from dotenv import load_dotenv
 import os
 import json
@@ -6,9 +21,14 @@ import google.generativeai as genai
 import asyncio
 import aiohttp
 import time
+import zipfile
+import threading
+import heapq
+import itertools
+import yaml
+from urllib.parse import quote
 from fastapi import APIRouter
 from pydantic import BaseModel
-import base64
 
 router = APIRouter()
 
@@ -19,29 +39,185 @@ class DocsRequest(BaseModel):
 
 load_dotenv()
 
-OLLAMA_URL = os.getenv("OLLAMA_URL")
+# Comma-separated list of Ollama generate endpoints; calls are spread across the healthy ones
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434/api/generate")
+OLLAMA_URLS = [url.strip() for url in OLLAMA_URL.split(",") if url.strip()]
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:latest")
+
+# Bounds of the adaptive number of concurrent model calls per backend, and the per-call timeout in seconds
+OLLAMA_MIN_CONCURRENCY = int(os.getenv("OLLAMA_MIN_CONCURRENCY", 1))
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", 8))
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", 300))
+
+# Hedging of slow model calls: off by default; the latency percentile that triggers a duplicate
+# request, and the largest share of calls that may be duplicated
+OLLAMA_HEDGE = os.getenv("OLLAMA_HEDGE", "false").lower() in ("1", "true", "yes")
+OLLAMA_HEDGE_PERCENTILE = float(os.getenv("OLLAMA_HEDGE_PERCENTILE", 0.95))
+OLLAMA_HEDGE_MAX_RATIO = float(os.getenv("OLLAMA_HEDGE_MAX_RATIO", 0.1))
+
+# Seconds between health probes of each backend, and consecutive failed calls before a backend is ejected
+OLLAMA_PROBE_INTERVAL = float(os.getenv("OLLAMA_PROBE_INTERVAL", 10))
+OLLAMA_FAILURE_THRESHOLD = int(os.getenv("OLLAMA_FAILURE_THRESHOLD", 3))
+
+# Files estimated above this many tokens are analysed in pieces split at declaration boundaries
+OLLAMA_CHUNK_TOKENS = int(os.getenv("OLLAMA_CHUNK_TOKENS", 1500))
+
+# Files up to OLLAMA_BATCH_FILE_TOKENS are packed together into prompts of up to OLLAMA_BATCH_TOKENS (0 disables batching)
+OLLAMA_BATCH_TOKENS = int(os.getenv("OLLAMA_BATCH_TOKENS", 1500))
+OLLAMA_BATCH_FILE_TOKENS = int(os.getenv("OLLAMA_BATCH_FILE_TOKENS", 400))
+
+# Share of model capacity per repository owner (GitHub user id) when runs compete, e.g. {"1234": 2}; default 1
+TENANT_WEIGHTS = json.loads(os.getenv("TENANT_WEIGHTS", "{}"))
+
+# Files read ahead of the model stage, and model jobs held back for longest-first ordering, before reading pauses
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 32))
+PIPELINE_MAX_PENDING = int(os.getenv("PIPELINE_MAX_PENDING", 256))
+
+# Model seconds per prompt token assumed for ordering until the limiter has measured latency
+DEFAULT_SECONDS_PER_TOKEN = float(os.getenv("DEFAULT_SECONDS_PER_TOKEN", 0.01))
+
+# The OpenAPI spec is assembled locally; Gemini only rewrites descriptions when enabled
+GEMINI_ENRICH = os.getenv("GEMINI_ENRICH", "false").lower() in ("1", "true", "yes")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash-latest")
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 60))
+
+# Consecutive failures before calls to a dependency fail fast, and seconds before it is probed again
+OLLAMA_BREAKER_THRESHOLD = int(os.getenv("OLLAMA_BREAKER_THRESHOLD", 5))
+OLLAMA_BREAKER_RESET = float(os.getenv("OLLAMA_BREAKER_RESET", 30))
+GEMINI_BREAKER_THRESHOLD = int(os.getenv("GEMINI_BREAKER_THRESHOLD", 3))
+GEMINI_BREAKER_RESET = float(os.getenv("GEMINI_BREAKER_RESET", 120))
+
+# Local copies of the last generated spec per branch, patched on incremental runs
+SPEC_CACHE_DIR = os.getenv("SPEC_CACHE_DIR", "backend/database/specs")
+
+# Request profile (see utils/ollama_profiles.py): system prompt, keep_alive, num_ctx, output cap and schema
+OLLAMA_PROFILE = os.getenv("OLLAMA_PROFILE", "structured")
+OLLAMA_REQUEST_PROFILE = get_profile(OLLAMA_PROFILE)
+
+# Inputs are chunked and batched small enough to fit the profile's fixed context
+OLLAMA_CHUNK_TOKENS = min(OLLAMA_CHUNK_TOKENS, input_tokens(OLLAMA_REQUEST_PROFILE, ANALYSE_SYSTEM_PROMPT) or OLLAMA_CHUNK_TOKENS)
+OLLAMA_BATCH_TOKENS = min(OLLAMA_BATCH_TOKENS, input_tokens(OLLAMA_REQUEST_PROFILE, BATCH_SYSTEM_PROMPT, files=None) or OLLAMA_BATCH_TOKENS)
+
+# Model jobs of all running pipelines waiting for a slot; they queue in analyse_files, not in the limiter
+PIPELINE_QUEUE = {"jobs": 0}
+
+# Tokens Ollama reports it evaluated and generated, for monitoring
+OLLAMA_TOKENS = {"calls": 0, "prompt_tokens": 0, "output_tokens": 0}
+
+# Bump whenever the analysis prompt changes so cached results of the old prompt are not reused;
+# profiles prompt differently, so each has its own cache entries
+PROMPT_VERSION = f"1-{OLLAMA_PROFILE}"
+
+SERVER_EXTENSIONS = {'.py', '.php', '.rb', '.java', '.go', '.rs', '.cs', '.js'}
+USER_EXTENSIONS = {'.html', '.css', '.jsx', '.tsx', '.vue', '.svelte'}
+
+def is_ollama_overload(error):
+    """Timeouts, refused connections, 429s and 5xx responses mean the model backend is saturated"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+# Generation processes sharing the model backends; each one limits itself to its share (see share_capacity)
+OLLAMA_PROCESSES = 1
+
+# Shared by every run in this process, since it tracks the capacity of the model backends
+ollama_limiter = AdaptiveLimiter(
+    min_limit=OLLAMA_MIN_CONCURRENCY * len(OLLAMA_URLS),
+    max_limit=OLLAMA_MAX_CONCURRENCY * len(OLLAMA_URLS),
+    initial_limit=2 * len(OLLAMA_URLS),
+    is_overload=is_ollama_overload,
+    tenant_weights=TENANT_WEIGHTS,
+)
+
+def scale_to_backends(healthy):
+    """Capacity follows the number of healthy backends, split evenly between the generation processes"""
+    healthy = max(1, healthy)
+    ollama_limiter.resize(max(1, OLLAMA_MIN_CONCURRENCY * healthy // OLLAMA_PROCESSES),
+                          max(1, OLLAMA_MAX_CONCURRENCY * healthy // OLLAMA_PROCESSES))
+
+def share_capacity(processes):
+    """
+    Limit this process to its share of the model backends
+
+    Limiters are per process: with several worker processes, each one would
+    otherwise allow OLLAMA_MAX_CONCURRENCY calls per backend on its own.
+    """
+    global OLLAMA_PROCESSES
+    OLLAMA_PROCESSES = max(1, processes)
+    scale_to_backends(ollama_pool.healthy_count())
+
+def is_backend_failure(error):
+    """Errors that say a backend is down rather than busy"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+ollama_breaker = CircuitBreaker("Ollama", failure_threshold=OLLAMA_BREAKER_THRESHOLD,
+                                reset_timeout=OLLAMA_BREAKER_RESET, is_failure=is_backend_failure)
+gemini_breaker = CircuitBreaker("Gemini", failure_threshold=GEMINI_BREAKER_THRESHOLD, reset_timeout=GEMINI_BREAKER_RESET)
+
+ollama_hedger = Hedger(percentile=OLLAMA_HEDGE_PERCENTILE, max_ratio=OLLAMA_HEDGE_MAX_RATIO)
+
+ollama_pool = ModelPool(
+    OLLAMA_URLS,
+    probe_interval=OLLAMA_PROBE_INTERVAL,
+    failure_threshold=OLLAMA_FAILURE_THRESHOLD,
+    is_failure=is_backend_failure,
+    on_health_change=scale_to_backends,
+)
 
 def determine_file_type(file_path):
     """Determine if a file is server-side or user-side based on extension"""
-    server_extensions = {'.py', '.php', '.rb', '.java', '.go', '.rs', '.cs', '.js'}
-    user_extensions = {'.html', '.css', '.jsx', '.tsx', '.vue', '.svelte'}
-    
     ext = os.path.splitext(file_path)[1].lower()
-    if ext in server_extensions:
+    if ext in SERVER_EXTENSIONS:
         return "server"
-    elif ext in user_extensions:
+    elif ext in USER_EXTENSIONS:
         return "user"
     return "other"
 
-async def process_with_ollama(session, content):
+def resolve_statically(file_path, file_info, stats):
+    """
+    Resolve a server file without a model call when possible
+
+    Files the AST extractor handles get their exact endpoints and files without
+    any route registration signature get an empty endpoint list. Returns None
+    when the file has to go to the model.
+    """
+    result = extract_static_endpoints(file_path, file_info["content"])
+    if result is not None:
+        stats["static"] += 1
+        return result
+    if not has_route_signature(file_path, file_info["content"]):
+        stats["skipped"] += 1
+        return {"endpoints": []}
+    stats["kept"] += 1
+    return None
+
+async def generate_with_ollama(session, body, used=None):
+    """
+    Send a request body to the Ollama generate API and return the raw JSON text it generated
+
+    Backends in `used` are avoided when others are available, and the chosen one is appended.
+    """
+    with ollama_breaker.guard():
+        async with ollama_pool.use(exclude=used or ()) as backend:
+            if used is not None:
+                used.append(backend)
+            async with session.post(backend.url, json=body) as response:
+                response.raise_for_status()
+                response_data = await response.json()
+    OLLAMA_TOKENS["calls"] += 1
+    OLLAMA_TOKENS["prompt_tokens"] += response_data.get("prompt_eval_count", 0)
+    OLLAMA_TOKENS["output_tokens"] += response_data.get("eval_count", 0)
+    return response_data.get("response", "")
+
+async def process_with_ollama(session, content, used=None):
     """Process file content through Ollama API asynchronously with improved prompt"""
-    async with session.post(
-        OLLAMA_URL,
-        json={
-            "model": "llama3.2:latest",
-            "format": "json",
-            "stream": False,
-            "prompt": f"""You are an expert API documentation generator. Analyze the following code and extract detailed API endpoint information. Focus on:
+    if OLLAMA_REQUEST_PROFILE.get("system_prompt"):
+        return await generate_with_ollama(session, build_request(
+            OLLAMA_REQUEST_PROFILE, OLLAMA_MODEL, ANALYSE_SYSTEM_PROMPT, f"Code to analyze:\n{content}", ENDPOINT_SCHEMA
+        ), used)
+    return await generate_with_ollama(session, build_request(OLLAMA_REQUEST_PROFILE, OLLAMA_MODEL, None, f"""You are an expert API documentation generator. Analyze the following code and extract detailed API endpoint information. Focus on:
             1. Complete endpoint paths
             2. HTTP methods (GET, POST, PUT, DELETE, etc.)
             3. Request parameters (query params, path params, request body)
@@ -73,133 +249,495 @@ async def process_with_ollama(session, content):
             - Ensure the description clearly explains the endpoint's purpose
             - If you can't determine certain details, use reasonable defaults based on the code context
 
-            Analyze every aspect of the code carefully to ensure accurate endpoint documentation."""
-        }
-    ) as response:
-        response_data = await response.json()
-        return response_data.get("response", "")
+            Analyze every aspect of the code carefully to ensure accurate endpoint documentation.""", ENDPOINT_SCHEMA), used)
+
+async def process_batch_with_ollama(session, files, used=None):
+    """Analyse several small files in one model call; returns the raw JSON text keyed by file path"""
+    packed = "\n\n".join(
+        f"===== FILE: {file_path} =====\n{content}\n===== END FILE: {file_path} ====="
+        for file_path, content in files.items()
+    )
+    if OLLAMA_REQUEST_PROFILE.get("system_prompt"):
+        return await generate_with_ollama(session, build_request(
+            OLLAMA_REQUEST_PROFILE, OLLAMA_MODEL, BATCH_SYSTEM_PROMPT, f"Files to analyze:\n{packed}", BATCH_SCHEMA,
+            files=len(files)
+        ), used)
+    return await generate_with_ollama(session, build_request(OLLAMA_REQUEST_PROFILE, OLLAMA_MODEL, None, f"""You are an expert API documentation generator. The input below contains {len(files)} separate source files, each between "===== FILE: <path> =====" and "===== END FILE: <path> =====" markers. Analyze each file independently and extract detailed API endpoint information: complete endpoint paths, HTTP methods, request parameters (query params, path params, request body), response structure, authentication requirements and the purpose of each endpoint.
+
+            Files to analyze:
+            {packed}
+
+            Return a valid JSON object with one entry per input file, keyed by the exact file path from its marker:
+            {{
+                "files": {{
+                    "<file path>": {{
+                        "endpoints": [
+                            {{
+                                "path": "/example",
+                                "method": "GET",
+                                "parameters": [],
+                                "description": "Description of endpoint"
+                            }}
+                        ]
+                    }}
+                }}
+            }}
+
+            Important:
+            - Include every input file as a key, with an empty "endpoints" list if it defines no endpoints
+            - Never attribute an endpoint to a file other than the one it is defined in
+            - Extract only actual API endpoints from the code
+            - Include all parameters, whether they're in the URL, query string, or request body
+            - Include authentication requirements if specified""", BATCH_SCHEMA, files=len(files)), used)
     
-async def process_files(repo_contents):
-    """Process files concurrently with a semaphore to limit concurrent requests"""
-    semaphore = asyncio.Semaphore(2)  # Limit to 2 concurrent requests
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for file_path, file_info in repo_contents.items():
-            if file_info["file_type"] == "server":
-                tasks.append(process_file(session, semaphore, file_path, file_info))
-        return await asyncio.gather(*tasks)
-
-async def process_file(session, semaphore, file_path, file_info):
-    """Process a single file with semaphore control"""
-    async with semaphore:
+async def run_analysis_pipeline(file_source, stats, history=None):
+    """
+    Analyse files while they are still being produced instead of stage after stage
+
+    `file_source` is a blocking iterator of (file_path, file_info), e.g. zipball
+    members being decompressed. It runs in a worker thread together with file
+    classification, static extraction and the prefilter, and feeds a bounded
+    queue that the model stage consumes while reading continues. Results are
+    collected as each file finishes. `history` is passed on to analyse_files.
+
+    :return: Dictionary of {file_path: endpoint result} for the files that produced one
+    """
+    loop = asyncio.get_running_loop()
+    file_queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    result_queue = asyncio.Queue()
+    for key in ("server_files", "static", "kept", "skipped"):
+        stats.setdefault(key, 0)
+
+    stop = threading.Event()
+
+    def put(queue, item):
+        # Blocks the reader thread while the queue is full
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def read_files():
+        started = time.time()
         try:
-            print(f"Processing {file_path}...")
-            print(f"Content: {file_info['content'][:100]}...")  # Truncate content for display
-            api_info = await process_with_ollama(session, file_info["content"])
-            return file_path, json.loads(api_info)
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
-            return file_path, None
+            for file_path, file_info in file_source:
+                if stop.is_set():
+                    break
+                file_info["file_type"] = determine_file_type(file_path)
+                if file_info["file_type"] != "server":
+                    continue
+                stats["server_files"] += 1
+                result = resolve_statically(file_path, file_info, stats)
+                if result is not None:
+                    put(result_queue, (file_path, result))
+                else:
+                    put(file_queue, (file_path, file_info))
+        finally:
+            stats["read_time"] = time.time() - started
+            put(file_queue, None)
 
-def generate_yaml_with_gemini(api_data):
-    """Generate YAML documentation using Gemini"""
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel("gemini-1.5-flash-latest")
-    
-    prompt = f"""You are an OpenAPI YAML generator. Convert this JSON to OpenAPI 3.0 specification YAML format. Output only the YAML content with no additional text, markdown, or code blocks. Do not include any explanations or notes.
-
-    Requirements:
-    - Use OpenAPI 3.0 format
-    - Include only the YAML content
-    - Start with 'openapi: 3.0.0'
-    - Include proper paths, methods, parameters, request bodies, and responses
-    - Exclude any commentary or explanations
-    - Do not wrap the output in code blocks or markdown
-
-    Input JSON:
-    {json.dumps(api_data, indent=2)}"""
-        
-    response = model.generate_content(prompt)
-    return response.text
+    reader = asyncio.ensure_future(asyncio.to_thread(read_files))
+    model_stage = asyncio.ensure_future(analyse_files(file_queue, result_queue, stats, history))
 
-async def save_to_github_branch(owner: str, repo: str, token: str, content: str,
-                              branch: str = "doccie", filename: str = "documentation.yaml"):
+    api_routes = {}
+    try:
+        while (item := await result_queue.get()) is not None:
+            file_path, result = item
+            if result is not None:
+                api_routes[file_path] = result
+            else:
+                stats.setdefault("failed_files", []).append(file_path)
+        await model_stage
+    finally:
+        if not reader.done():
+            # Stop the reader and unblock it if it is waiting on a full queue
+            stop.set()
+            model_stage.cancel()
+            while not reader.done():
+                while not file_queue.empty():
+                    file_queue.get_nowait()
+                await asyncio.sleep(0.01)
+    # Re-raises errors hit while reading the source
+    await reader
+    return api_routes
+
+async def analyse_files(file_queue, result_queue, stats, history=None):
     """
-    Save content to a specific branch using GitHub REST API
+    Model stage: consume (file_path, file_info) items until None and put (file_path, result)
+    on result_queue as each file finishes, followed by None
+
+    Cache hits are answered immediately, small files are packed into batches as
+    they arrive and everything else is analysed on its own. Jobs are started
+    longest first: each is costed from the file's model time in earlier runs
+    (`history`, {file_path: seconds}) or else its token count, so a huge router
+    never runs alone at the end of the run.
     """
-    headers = {
-        "Accept": "application/vnd.github+json",
-        "Authorization": f"Bearer {token}",
-        "X-GitHub-Api-Version": "2022-11-28"
-    }
-    base_url = "https://api.github.com"
+    for key in ("cache_hits", "cache_misses", "batches"):
+        stats.setdefault(key, 0)
+    history = history or {}
+    ready = []
+    sequence = itertools.count()
+    running = set()
+    costs = []
+    unmeasured = 0
 
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Step 1: Get the default branch's SHA
-            url = f"{base_url}/repos/{owner}/{repo}/git/refs/heads"
-            async with session.get(url, headers=headers) as response:
-                if response.status != 200:
-                    raise Exception(f"Failed to get refs: {await response.text()}")
-                refs = await response.json()
-                default_ref = next((ref for ref in refs if ref["ref"].endswith("/main") or ref["ref"].endswith("/master")), None)
-                if not default_ref:
-                    raise Exception("Could not find default branch")
-                default_sha = default_ref["object"]["sha"]
-
-            # Step 2: Check if doccie branch exists
-            url = f"{base_url}/repos/{owner}/{repo}/git/refs/heads/{branch}"
-            async with session.get(url, headers=headers) as response:
-                if response.status == 404:
-                    # Create doccie branch
-                    create_branch_data = {
-                        "ref": f"refs/heads/{branch}",
-                        "sha": default_sha
-                    }
-                    url = f"{base_url}/repos/{owner}/{repo}/git/refs"
-                    async with session.post(url, headers=headers, json=create_branch_data) as response:
-                        if response.status not in [201, 200]:
-                            raise Exception(f"Failed to create branch: {await response.text()}")
-                elif response.status != 200:
-                    raise Exception(f"Failed to check branch: {await response.text()}")
-
-            # Step 3: Check if file exists
-            url = f"{base_url}/repos/{owner}/{repo}/contents/{filename}"
-            params = {"ref": branch}
-            async with session.get(url, headers=headers, params=params) as response:
-                file_exists = response.status == 200
-                if file_exists:
-                    file_data = await response.json()
-                    file_sha = file_data["sha"]
+    def expected_seconds(file_path, tokens):
+        nonlocal unmeasured
+        if file_path in history:
+            return history[file_path]
+        expected = ollama_limiter.expected_latency(tokens)
+        if expected is None:
+            # Nothing measured yet: good enough for ordering, not for reporting
+            unmeasured += 1
+            return tokens * DEFAULT_SECONDS_PER_TOKEN
+        return expected
+
+    def push(cost, job):
+        # Max-heap on expected cost; the sequence keeps equal costs in arrival order
+        heapq.heappush(ready, (-cost, next(sequence), job))
+        PIPELINE_QUEUE["jobs"] += 1
+
+    async def run(job):
+        outcome = await job
+        for item in outcome if isinstance(outcome, list) else [outcome]:
+            await result_queue.put(item)
+
+    try:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=OLLAMA_TIMEOUT)) as session:
+            batch, batch_tokens = {}, 0
+
+            def flush_batch():
+                nonlocal batch, batch_tokens
+                if len(batch) == 1:
+                    file_path, file_info = next(iter(batch.items()))
+                    job = process_file(session, ollama_limiter, file_path, file_info,
+                                       hash_content(file_info["content"]), stats)
                 else:
-                    file_sha = None
-
-            # Step 4: Create or update file
-            url = f"{base_url}/repos/{owner}/{repo}/contents/{filename}"
-            file_content_encoded = base64.b64encode(content.encode()).decode()
-            
-            update_data = {
-                "message": f"{'Update' if file_exists else 'Create'} {filename}",
-                "content": file_content_encoded,
-                "branch": branch
-            }
-            
-            if file_sha:
-                update_data["sha"] = file_sha
-
-            async with session.put(url, headers=headers, json=update_data) as response:
-                if response.status not in [200, 201]:
-                    raise Exception(f"Failed to {'update' if file_exists else 'create'} file: {await response.text()}")
-
-            print(f"Successfully {'updated' if file_exists else 'created'} {filename} in {branch} branch")
-            return True
+                    job = process_batch(session, ollama_limiter, batch, stats)
+                push(expected_seconds(None, batch_tokens), job)
+                batch, batch_tokens = {}, 0
 
-        except Exception as e:
-            print(f"Error saving to GitHub: {str(e)}")
-            return False
+            async def accept(file_path, file_info):
+                nonlocal batch_tokens
+                file_hash = hash_content(file_info["content"])
+                cached = await asyncio.to_thread(get_cached_result, file_hash, PROMPT_VERSION, OLLAMA_MODEL)
+                if cached is not None:
+                    stats["cache_hits"] += 1
+                    print(f"Cache hit for {file_path}")
+                    await result_queue.put((file_path, cached))
+                    return
+
+                stats["cache_misses"] += 1
+                tokens = estimate_tokens(file_info["content"])
+                if OLLAMA_BATCH_TOKENS and tokens <= OLLAMA_BATCH_FILE_TOKENS:
+                    if batch and batch_tokens + tokens > OLLAMA_BATCH_TOKENS:
+                        flush_batch()
+                    batch[file_path] = file_info
+                    batch_tokens += tokens
+                else:
+                    push(expected_seconds(file_path, tokens),
+                         process_file(session, ollama_limiter, file_path, file_info, file_hash, stats))
+
+            reading, getter, started = True, None, None
+            # An unsent batch keeps the loop going, so files accepted just before the end marker are still flushed
+            while reading or batch or ready or running:
+                # Take in what the reader has produced so far, up to the look-ahead window
+                while reading and len(ready) < PIPELINE_MAX_PENDING and not file_queue.empty():
+                    item = file_queue.get_nowait()
+                    if item is None:
+                        reading = False
+                    else:
+                        await accept(*item)
+                if not reading and batch:
+                    flush_batch()
+
+                # Keep the limiter just saturated so the order is decided here, not in its queue
+                while ready and len(running) <= int(ollama_limiter.limit):
+                    cost, _, job = heapq.heappop(ready)
+                    PIPELINE_QUEUE["jobs"] -= 1
+                    costs.append(-cost)
+                    started = started or time.time()
+                    running.add(asyncio.ensure_future(run(job)))
+
+                waits = set(running)
+                if reading and len(ready) < PIPELINE_MAX_PENDING:
+                    getter = getter or asyncio.ensure_future(file_queue.get())
+                    waits.add(getter)
+                if not waits:
+                    continue
+                done, _ = await asyncio.wait(waits, return_when=asyncio.FIRST_COMPLETED)
+                running -= done
+                for task in done - {getter}:
+                    task.result()
+                if getter in done:
+                    item, getter = getter.result(), None
+                    if item is None:
+                        reading = False
+                    else:
+                        await accept(*item)
+    finally:
+        PIPELINE_QUEUE["jobs"] -= len(ready)
+        if getter is not None:
+            getter.cancel()
+        for task in running:
+            task.cancel()
+        if costs:
+            stats["makespan"] = {"actual": time.time() - started, "unmeasured_jobs": unmeasured}
+            if not unmeasured:
+                # Lower bound for the model stage: the longest job, or all work spread over the limit
+                stats["makespan"]["expected"] = max(max(costs), sum(costs) / max(1, int(ollama_limiter.limit)))
+        await result_queue.put(None)
+
+async def process_batch(session, limiter, batch, stats):
+    """
+    Process several small files with a single model call
+
+    Files missing or malformed in the model's keyed response are retried on
+    their own, so a bad batch never loses a file.
+    """
+    print(f"Processing batch of {len(batch)} files: {', '.join(batch)}")
+    stats["batches"] += 1
+    file_results = {}
+    try:
+        batch_tokens = sum(estimate_tokens(file_info["content"]) for file_info in batch.values())
+        contents = {file_path: file_info["content"] for file_path, file_info in batch.items()}
+        ollama_breaker.raise_if_open()
+        async with limiter.slot(cost=batch_tokens):
+            response = await request_json(lambda used: process_batch_with_ollama(session, contents, used), batch_tokens)
+        returned = response.get("files", response) if isinstance(response, dict) else {}
+        returned = {str(key).strip().removeprefix("./"): value for key, value in returned.items()}
+        for file_path in batch:
+            result = returned.get(file_path.removeprefix("./"))
+            if isinstance(result, dict) and isinstance(result.get("endpoints"), list):
+                file_results[file_path] = result
+    except Exception as e:
+        print(f"Error processing batch: {e}")
+
+    outcomes = []
+    retries = []
+    for file_path, file_info in batch.items():
+        file_hash = hash_content(file_info["content"])
+        if file_path in file_results:
+            await asyncio.to_thread(put_cached_result, file_hash, PROMPT_VERSION, OLLAMA_MODEL, file_results[file_path])
+            outcomes.append((file_path, file_results[file_path]))
+        else:
+            retries.append(process_file(session, limiter, file_path, file_info, file_hash, stats))
+    if retries:
+        print(f"Retrying {len(retries)} files individually after batch")
+        outcomes.extend(await asyncio.gather(*retries))
+    return outcomes
+
+async def process_file(session, limiter, file_path, file_info, file_hash, stats):
+    """Process a single file under the concurrency limit and cache its result"""
+    timings = []
+    try:
+        print(f"Processing {file_path}...")
+        print(f"Content: {file_info['content'][:100]}...")  # Truncate content for display
+        chunks = chunk_source(file_info["content"], OLLAMA_CHUNK_TOKENS)
+        if len(chunks) == 1:
+            api_info = await analyse_content(session, limiter, chunks[0], timings)
+        else:
+            # Large files are split so nothing is truncated, and the pieces run in parallel
+            print(f"Split {file_path} into {len(chunks)} chunks")
+            stats["chunked_files"] = stats.get("chunked_files", 0) + 1
+            chunk_results = await asyncio.gather(*(analyse_content(session, limiter, chunk, timings) for chunk in chunks))
+            api_info = merge_endpoint_results(chunk_results)
+        await asyncio.to_thread(put_cached_result, file_hash, PROMPT_VERSION, OLLAMA_MODEL, api_info)
+        # Model time of the file, used to order the next run
+        stats.setdefault("file_latencies", {})[file_path] = sum(timings)
+        return file_path, api_info
+    except Exception as e:
+        print(f"Error processing {file_path}: {e}")
+        return file_path, None
+
+async def analyse_content(session, limiter, content, timings=None):
+    """Run one model call under the concurrency limit and parse its JSON; the call's duration is appended to `timings`"""
+    cost = estimate_tokens(content)
+    # Fail before taking a slot, so a dead backend neither queues calls nor skews the limiter
+    ollama_breaker.raise_if_open()
+    async with limiter.slot(cost=cost):
+        started = time.monotonic()
+        api_info = await request_json(lambda used: process_with_ollama(session, content, used), cost)
+        if timings is not None:
+            timings.append(time.monotonic() - started)
+    return api_info
+
+async def request_json(request, cost):
+    """
+    Run `request(used)` and parse the JSON it returns
+
+    With OLLAMA_HEDGE on, a call slower than recent calls is duplicated on
+    another backend (or another slot of the same one) and the first valid
+    JSON wins.
+    """
+    if not OLLAMA_HEDGE:
+        return json.loads(await request(None))
+    used = []
+
+    async def attempt(index):
+        return json.loads(await request(used))
+
+    return await ollama_hedger.run(attempt, cost)
+
+def generate_openapi_yaml(api_routes, branch, base_spec=None, changed_files=None):
+    """
+    Assemble the OpenAPI YAML locally from the extracted endpoints, optionally letting Gemini improve descriptions
+
+    With a base spec from a previous run only the operations of `changed_files`
+    are replaced; otherwise the spec is built from all of `api_routes`.
+    :return: (yaml content, number of validation problems, "patched" or "full")
+    """
+    if base_spec is not None:
+        spec = base_spec
+        added = patch_openapi_spec(spec, api_routes, changed_files)
+        mode = "patched"
+    else:
+        spec = build_openapi_spec(api_routes)
+        spec["info"]["x-source-branch"] = branch
+        added = None
+        mode = "full"
+
+    if GEMINI_ENRICH and gemini_breaker.is_open():
+        print("Description enrichment skipped: Gemini circuit is open")
+    elif GEMINI_ENRICH:
+        enrich_descriptions_with_gemini(spec, added)
+
+    problems = validate_openapi_spec(spec)
+    for problem in problems:
+        print(f"OpenAPI validation: {problem}")
+    return dump_openapi_yaml(spec), len(problems), mode
+
+def spec_cache_path(owner, repo, branch):
+    return os.path.join(SPEC_CACHE_DIR, owner, repo, quote(branch, safe="") + ".yaml")
+
+async def load_previous_spec(owner, repo, token, branch, docs_branch="doccie", filename="documentation.yaml"):
+    """
+    Load the spec of the last run for a branch, from the local copy or else from the docs branch
+
+    Returns None when there is none, or when it cannot be patched (built for
+    another branch, or by a version that did not record source files).
+    """
+    local_path = spec_cache_path(owner, repo, branch)
+    try:
+        if os.path.exists(local_path):
+            with open(local_path) as f:
+                content = f.read()
+        else:
+            files = await fetch_github_files(owner, repo, token, [filename], ref=docs_branch)
+            if filename not in files:
+                return None
+            content = files[filename]["content"]
+        spec = await asyncio.to_thread(yaml.safe_load, content)
+    except Exception as e:
+        print(f"Could not load the previous spec: {e}")
+        return None
+
+    if not is_patchable_spec(spec) or spec.get("info", {}).get("x-source-branch") != branch:
+        return None
+    return spec
+
+def save_local_spec(owner, repo, branch, content):
+    local_path = spec_cache_path(owner, repo, branch)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    with open(local_path, "w") as f:
+        f.write(content)
+
+def enrich_descriptions_with_gemini(spec, only=None):
+    """
+    Rewrite operation summaries and descriptions with Gemini
+
+    Only a compact list of operations is sent and only the returned text is
+    applied, so the structure of the spec never depends on the model. Any
+    failure leaves the spec as assembled. `only` limits the pass to a list of
+    (path, method) operations, e.g. those added by a patch.
+    """
+    if only is None:
+        only = [(path, method) for path, path_item in spec["paths"].items() for method in path_item]
+    operations = {f"{method.upper()} {path}": spec["paths"][path][method] for path, method in only}
+    if not operations:
+        return
+
+    listing = "\n".join(
+        f"{key}: {operation.get('description') or operation['summary']}"
+        + (f" (parameters: {', '.join(p['name'] for p in operation['parameters'])})" if operation.get("parameters") else "")
+        for key, operation in operations.items()
+    )
+    prompt = f"""You are writing API reference documentation. For each endpoint below, write a short summary (at most 10 words) and a one or two sentence description of its purpose.
+
+    Return only a JSON object mapping each endpoint exactly as given ("METHOD /path") to {{"summary": "...", "description": "..."}}.
+
+    Endpoints:
+    {listing}"""
+
+    try:
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        model = genai.GenerativeModel(GEMINI_MODEL)
+        with gemini_breaker.guard():
+            response = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"},
+                                              request_options={"timeout": GEMINI_TIMEOUT})
+        enriched = json.loads(response.text)
+    except Exception as e:
+        print(f"Description enrichment skipped: {e}")
+        return
+
+    for key, text in enriched.items() if isinstance(enriched, dict) else []:
+        operation = operations.get(key)
+        if operation is None or not isinstance(text, dict):
+            continue
+        if isinstance(text.get("summary"), str) and text["summary"].strip():
+            operation["summary"] = text["summary"].strip()
+        if isinstance(text.get("description"), str) and text["description"].strip():
+            operation["description"] = text["description"].strip()
+
+async def save_to_github_branch(owner: str, repo: str, token: str, content: str,
+                              branch: str = "doccie", filename: str = "documentation.yaml",
+                              extra_files: dict = None):
+    """
+    Save content, and any extra generated files, to a branch in a single commit
+
+    Returns the publish result (see publish_files), or None if it failed.
+    Files already on the branch with the same content are not uploaded again.
+    """
+    files = {filename: content, **(extra_files or {})}
+    try:
+        return await publish_files(owner, repo, token, files, branch=branch)
+    except Exception as e:
+        print(f"Error saving to GitHub: {str(e)}")
+        return None
     
+@router.get("/status")
+async def generation_status():
+    """
+    Current state of the model concurrency limiter and the result cache, for monitoring
+
+    "scheduler" covers runs inside this process (GENERATION_MODE=inline); "jobs"
+    counts the queued, running and finished jobs of worker processes.
+    """
+    return {
+        "ollama": {**ollama_limiter.stats(), "pipeline_queue_depth": PIPELINE_QUEUE["jobs"],
+                   "profile": OLLAMA_PROFILE, **OLLAMA_TOKENS},
+        "ollama_backends": ollama_pool.stats(),
+        "hedging": {"enabled": OLLAMA_HEDGE, **ollama_hedger.stats()},
+        "breakers": {"ollama": ollama_breaker.stats(), "gemini": gemini_breaker.stats()},
+        "llm_cache": await asyncio.to_thread(cache_stats),
+        "github_cache": response_cache.stats(),
+        "github_rate_limits": rate_limiter.stats(),
+        "scheduler": generation_scheduler.stats(),
+        "jobs": await asyncio.to_thread(job_stats),
+    }
+
 # @router.post("/generate-api-docs")
 async def async_main(request):
+    """
+    Generate and upload API documentation for a repository
+
+    When the request carries a "changes" dict ({"changed": [...], "removed": [...]})
+    and results of a previous run are stored for the branch, only the changed files
+    are fetched and analysed; stored results are reused for everything else.
+
+    A request scheduled by generation_scheduler carries a "superseded" event;
+    once it is set the run raises Superseded at the next stage boundary.
+
+    Model calls are queued fairly against other runs under the request's
+    "owner_id" (falling back to the owner login) and repository.
+    """
     start_time = time.time()
 
     print("Starting API documentation generation...")
@@ -207,47 +745,113 @@ async def async_main(request):
     owner = request["owner"]
     repo = request["repo"]
     token = request["token"]
+    branch = request.get("branch", "main")
+    changes = request.get("changes")
+    current_flow.set((str(request.get("owner_id") or owner), f"{owner}/{repo}"))
+    # GitHub calls of a generation run wait behind those of people using the UI
+    github_priority.set(BACKGROUND)
 
     print(f"Owner: {owner}, Repo: {repo}, Token: {token}")
-    
-    # Try to get repository contents, fall back to sample file if it fails
-    repo_contents = get_github_repo_contents(owner, repo, token)
-    if not repo_contents:
-        return {"Message": "Failed to retrieve repository contents"}    
-    
-    # Add file_type classification
-    file_count = 0
-    for file_path in repo_contents:
-        repo_contents[file_path]["file_type"] = determine_file_type(file_path)
-        if repo_contents[file_path]["file_type"] == "server":
-            file_count += 1
-    
-    print(f"Found {file_count} server-side files to process")
-    
-    # Process server files with Ollama concurrently
+
+    stored_results = read_results(owner, repo, branch) if changes else {}
+    incremental = bool(stored_results)
+    removed_files = set()
+
+    if incremental:
+        print(f"Incremental run: {len(changes['changed'])} changed, {len(changes['removed'])} removed files")
+        try:
+            repo_contents = await fetch_github_files(
+                owner, repo, token, changes["changed"],
+                ref=request.get("ref", branch), extensions=SERVER_EXTENSIONS
+            )
+            # Changed files missing at the head commit were deleted by a later commit
+            removed_files = set(changes["removed"]) | (set(changes["changed"]) - set(repo_contents))
+        except Exception as e:
+            print(f"Incremental fetch failed, falling back to a full run: {e}")
+            incremental = False
+
+    archive_file = None
+    download_start = time.time()
+    if not incremental:
+        try:
+            archive_file = await download_github_archive(owner, repo, token, branch=branch)
+        except Exception as e:
+            print(f"Error downloading repository archive: {e}")
+            return {"Message": "Failed to retrieve repository contents"}
+        # Only server-side files are documented, so everything else is skipped before decompression
+        file_source = iter_archive_file(archive_file, SERVER_EXTENSIONS)
+    else:
+        file_source = iter(repo_contents.items())
+    download_end = time.time()
+
+    # Members are decompressed, classified and statically analysed in a worker thread
+    # while the model works through the files that need it
     process_start = time.time()
-    results = await process_files(repo_contents)
+    process_stats = {}
+    try:
+        raise_if_superseded(request)
+        new_routes = await run_analysis_pipeline(file_source, process_stats, read_latencies(owner, repo, branch))
+    except zipfile.BadZipFile as e:
+        print(f"Error reading repository archive: {e}")
+        return {"Message": "Failed to retrieve repository contents"}
+    finally:
+        if archive_file is not None:
+            archive_file.close()
     process_end = time.time()
-    
-    # Convert results to dictionary
-    api_routes = {file_path: result for file_path, result in results if result is not None}
+
+    save_latencies(owner, repo, branch, process_stats.pop("file_latencies", {}))
+    file_count = process_stats.pop("server_files")
+    failed_files = set(process_stats.pop("failed_files", []))
+    print(f"Processed {file_count} server-side files: {process_stats['static']} statically, "
+          f"{process_stats['skipped']} skipped without routes, {process_stats['kept']} sent to the model")
+
+    # Last point at which a newer push can take over without leaving stored results half updated
+    raise_if_superseded(request)
+
+    if incremental:
+        # Files that failed to process keep their previous result
+        api_routes = {file_path: result for file_path, result in stored_results.items()
+                      if file_path not in removed_files}
+        api_routes.update(new_routes)
+        delete_results(owner, repo, branch, removed_files)
+        save_results(owner, repo, branch, new_routes)
+    else:
+        api_routes = new_routes
+        if failed_files:
+            # Degraded run (e.g. the model is down): failed files keep their last known result
+            previous = read_results(owner, repo, branch)
+            api_routes.update({file_path: previous[file_path] for file_path in failed_files if file_path in previous})
+        replace_results(owner, repo, branch, api_routes)
+
+    # Results arrive in completion order; sort by path so unchanged docs serialise identically and skip the upload
+    api_routes = dict(sorted(api_routes.items()))
     
     # Save API routes to file
+    routes_json = json.dumps(api_routes, indent=2)
     with open("api_routes.json", "w") as f:
-        json.dump(api_routes, f, indent=2)
+        f.write(routes_json)
     
-    # Generate YAML documentation
-    yaml_content = generate_yaml_with_gemini(api_routes)
+    # Generate YAML documentation, patching the previous spec when only some files changed
+    spec_start = time.time()
+    base_spec = await load_previous_spec(owner, repo, token, branch) if incremental else None
+    yaml_content, spec_problems, spec_mode = await asyncio.to_thread(
+        generate_openapi_yaml, api_routes, branch, base_spec, set(new_routes) | removed_files
+    )
+    save_local_spec(owner, repo, branch, yaml_content)
+    spec_end = time.time()
+
+    raise_if_superseded(request)
     
-    #! Save yaml content to doccie branch
-    upload_success = await save_to_github_branch(
+    #! Save yaml content and the endpoints found per file to doccie branch, in one commit
+    upload_result = await save_to_github_branch(
         owner=owner,
         repo=repo,
         token=token,
-        content=yaml_content
+        content=yaml_content,
+        extra_files={"api_routes.json": routes_json}
     )
     
-    if not upload_success:
+    if upload_result is None:
         return {"Message": "Failed to upload documentation to GitHub"}
     
     end_time = time.time()
@@ -255,8 +859,30 @@ async def async_main(request):
     return {
         "Message": "API documentation generated and uploaded successfully",
         "Statistics": {
+            "mode": "incremental" if incremental else "full",
             "files_processed": file_count,
+            "files_static": process_stats.pop("static"),
+            "prefilter": {"kept": process_stats.pop("kept"), "skipped": process_stats.pop("skipped")},
+            "files_reused": len(api_routes) - len(new_routes),
+            "files_removed": len(removed_files),
+            "makespan": process_stats.pop("makespan", None),
+            "degraded": {
+                "ollama_circuit": ollama_breaker.stats()["state"],
+                "files_failed": len(failed_files),
+                "files_stale": len(failed_files & set(api_routes)),
+            },
+            "llm_cache": process_stats,
+            "concurrency": ollama_limiter.stats(),
+            "download_time": download_end - download_start,
+            "read_time": process_stats.pop("read_time", None),
             "processing_time": process_end - process_start,
+            "spec_time": spec_end - spec_start,
+            "spec_problems": spec_problems,
+            "spec_mode": spec_mode,
+            "uploads_skipped": len(upload_result["skipped"]),
             "total_time": end_time - start_time
         }
-    }
\ No newline at end of file
+    }
+
+# Webhook-triggered runs: one at a time per repository branch, bursts of pushes coalesced
+generation_scheduler = CoalescingScheduler(async_main)
@@ -6,6 +6,7 @@ import jwt
 import json
 
 from utils.auth import get_current_user
+from utils.github_client import github_get, github_request
 from database_models.token_store import save_token
 
 import os
@@ -53,7 +54,9 @@ async def get_access_token(code: str):
         
         # Get user info
         github_token = token_data["access_token"]
-        user_response = await client.get(
+        user_response = await github_request(
+            client,
+            "GET",
             "https://api.github.com/user",
             headers={
                 "Authorization": f"Bearer {github_token}",
@@ -86,13 +89,8 @@ async def get_access_token(code: str):
 async def user_data(current_user: dict = Depends(get_current_user)):
     """Get user data"""
     async with httpx.AsyncClient() as client:
-        response = await client.get(
-            "https://api.github.com/user",
-            headers={
-                "Authorization": f"Bearer {current_user['github_token']}",
-                "Accept": "application/json",
-            },
-        )
+        response = await github_get(client, "https://api.github.com/user", current_user['github_token'],
+                                    endpoint="/user")
         user_data = response.json()
 
         return user_data
\ No newline at end of file
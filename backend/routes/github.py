@@ -6,8 +6,10 @@ import jwt
 import json
 
 from utils.auth import get_current_user
-from .assistant import async_main
+from utils.github_client import github_request
+from .assistant import generation_scheduler
 from database_models.token_store import save_token, read_token
+from database_models.job_store import enqueue_job
 from models.data_models import addRepo
 from .database import add_user, get_data, remove_repo
 
@@ -20,6 +22,8 @@ router = APIRouter()
 GITHUB_API_URL = "https://api.github.com"
 GITHUB_CALLBACK_URL = os.getenv("GITHUB_CALLBACK_URL")
 DOC_BRANCH = "doccie"
+# "inline" runs generation inside this process, "worker" queues it for backend/worker.py processes
+GENERATION_MODE = os.getenv("GENERATION_MODE", "inline")
 
 @router.post("/create-webhook")
 async def create_github_webhook(addRepoRequest:addRepo, current_user: dict = Depends(get_current_user)):
@@ -38,7 +42,7 @@ async def create_github_webhook(addRepoRequest:addRepo, current_user: dict = Dep
         }
     }
     async with httpx.AsyncClient() as client:
-        response = await client.post(f"{GITHUB_API_URL}/repos/{current_user['username']}/{addRepoRequest.name}/hooks", headers=headers, json=data) #! maybe full_name instead of name
+        response = await github_request(client, "POST", f"{GITHUB_API_URL}/repos/{current_user['username']}/{addRepoRequest.name}/hooks", headers=headers, json=data) #! maybe full_name instead of name
         response_json = response.json()
         print("webhook create response: ", json.dumps(response_json,indent=2))
         if response.status_code == 201:
@@ -49,6 +53,30 @@ async def create_github_webhook(addRepoRequest:addRepo, current_user: dict = Dep
             raise HTTPException(status_code=response.status_code, detail=response.json())
 
 
+def collect_changed_files(payload):
+    """
+    Collapse the per-commit added/modified/removed lists of a push payload
+
+    Commits are applied in order, so a file added and later removed ends up
+    removed. Returns None when the payload cannot be trusted for an incremental
+    run (ping events, force pushes, new branches).
+    """
+    commits = payload.get("commits")
+    if not commits or payload.get("forced") or payload.get("created"):
+        return None
+
+    changed, removed = set(), set()
+    for commit in commits:
+        for path in commit.get("added", []) + commit.get("modified", []):
+            changed.add(path)
+            removed.discard(path)
+        for path in commit.get("removed", []):
+            removed.add(path)
+            changed.discard(path)
+
+    return {"changed": sorted(changed), "removed": sorted(removed)}
+
+
 @router.post("/webhook")
 async def github_webhook(request:Request):
     payload_headers = request.headers
@@ -65,16 +93,35 @@ async def github_webhook(request:Request):
         token = read_token(payload["repository"]["owner"]["id"])
         if token is None:
             raise HTTPException(status_code=404, detail="Token not found during webhook event")
-        print("Calling api documentation generation")
-        generate_api_docs = await async_main({
-            "owner":payload["repository"]["owner"]["login"],
-            "repo": payload["repository"]["name"],
-            "token":  token.token
-        })
-
-        print("API documentation generation completed", generate_api_docs)
-        # Handle push event
-        return {"message": "Push event received"}
+        ref = payload.get("ref", "")
+        default_branch = payload["repository"].get("default_branch", "main")
+        # Ping events carry no ref and stand for the default branch; tag pushes are not branches at all
+        branch = ref[len("refs/heads/"):] if ref.startswith("refs/heads/") else (ref or default_branch)
+        if branch != default_branch:
+            # The doccie branch holds a single documentation.yaml, which documents the default branch
+            print(f"Ignoring push to {branch}: only {default_branch} is documented")
+            return {"message": f"Push to {branch} ignored, only {default_branch} is documented"}
+        owner = payload["repository"]["owner"]["login"]
+        repo = payload["repository"]["name"]
+        changes = collect_changed_files(payload) if event == "push" else None
+        # Runs in the background so the delivery is acknowledged at once; pushes arriving
+        # while a run for the same branch is in flight collapse into one follow-up run
+        if GENERATION_MODE == "worker":
+            status = enqueue_job(owner, repo, branch, str(payload["repository"]["owner"]["id"]),
+                                 payload.get("after") or branch, changes)
+        else:
+            status = generation_scheduler.submit((owner, repo, branch), {
+                "owner": owner,
+                "owner_id": str(payload["repository"]["owner"]["id"]),
+                "repo": repo,
+                "token":  token.token,
+                "branch": branch,
+                "ref": payload.get("after") or branch,
+                "changes": changes
+            })
+        print(f"API documentation generation {status} for {owner}/{repo}@{branch}")
+
+        return {"message": "Push event received", "generation": status}
     else:
         return {"message": f"Unhandled event: {event}"}
     
@@ -90,7 +137,7 @@ async def delete_github_webhook(addRepoRequest:addRepo, current_user: dict = Dep
     print("Get data response: ", get_data_response)
 
     async with httpx.AsyncClient() as client:
-        response = await client.delete(f"{GITHUB_API_URL}/repos/{current_user['username']}/{addRepoRequest.name}/hooks/{get_data_response.webhook_id}", headers=headers)
+        response = await github_request(client, "DELETE", f"{GITHUB_API_URL}/repos/{current_user['username']}/{addRepoRequest.name}/hooks/{get_data_response.webhook_id}", headers=headers)
         if response.status_code == 204:
             print("Web hook deleted successfully")
             return remove_repo(addRepoRequest.id)
@@ -6,6 +6,8 @@ import logging
 import os
 from pydantic import BaseModel
 from utils.auth import get_current_user
+from utils.github_client import github_get
+from utils.repo_tree import load_repository_tree, subtree
 from models.data_models import ReadDocsRequest
 import yaml
 import jwt
@@ -29,12 +31,11 @@ class createDb(BaseModel):
 async def list_repositories(current_user: dict = Depends(get_current_user)):
     """List all repositories the user has access to with their database status"""
     async with httpx.AsyncClient() as client:
-        response = await client.get(
+        response = await github_get(
+            client,
             "https://api.github.com/user/repos",
-            headers={
-                "Authorization": f"Bearer {current_user['github_token']}",
-                "Accept": "application/json",
-            },
+            current_user['github_token'],
+            endpoint="/user/repos",
         )
         
         if response.status_code != 200:
@@ -76,82 +77,74 @@ async def list_repositories(current_user: dict = Depends(get_current_user)):
         #     logging.error(f"Unexpected error while processing repositories: {e}")
         #     raise HTTPException(status_code=500, detail="An unexpected error occurred")
     
+async def fetch_repository(client, repo_id, token):
+    response = await github_get(
+        client,
+        f"https://api.github.com/repositories/{repo_id}",
+        token,
+        endpoint="/repositories/{id}",
+    )
+    if response.status_code != 200:
+        raise HTTPException(status_code=404, detail="Repository not found")
+    return response.json()
+
 @router.get("/{repo_id}")
 async def get_repository_details(repo_id: int, current_user: dict = Depends(get_current_user)):
-    """Get detailed information about a specific repository"""
+    """Get detailed information about a specific repository, with the top level of its directory tree"""
     async with httpx.AsyncClient() as client:
-        # Get repo details
-        response = await client.get(
-            f"https://api.github.com/repositories/{repo_id}",
-            headers={
-                "Authorization": f"Bearer {current_user['github_token']}",
-                "Accept": "application/json",
-            },
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(status_code=404, detail="Repository not found")
-            
-        repo_data = response.json()
-        
-        # Get repository contents
-        contents_response = await client.get(
-            f"https://api.github.com/repos/{repo_data['full_name']}/contents",
-            headers={
-                "Authorization": f"Bearer {current_user['github_token']}",
-                "Accept": "application/json",
-            },
-        )
-        
-        if contents_response.status_code != 200:
-            raise HTTPException(status_code=400, detail="Failed to fetch repository contents")
-            
-        contents = contents_response.json()
-        
-        # Extract directory structure
-        async def get_directory_contents(path=""):
-            dir_response = await client.get(
-                f"https://api.github.com/repos/{repo_data['full_name']}/contents/{path}",
-                headers={
-                    "Authorization": f"Bearer {current_user['github_token']}",
-                    "Accept": "application/json",
-                },
+        repo_data = await fetch_repository(client, repo_id, current_user['github_token'])
+
+        try:
+            sha, index, truncated = await load_repository_tree(
+                client, repo_data["full_name"], repo_data["default_branch"], current_user['github_token']
             )
-            
-            if dir_response.status_code != 200:
-                return []
-                
-            items = dir_response.json()
-            structure = []
-            
-            for item in items:
-                if item["type"] == "dir":
-                    children = await get_directory_contents(item["path"])
-                    structure.append({
-                        "name": item["name"],
-                        "path": item["path"],
-                        "type": "directory",
-                        "children": children
-                    })
-                else:
-                    structure.append({
-                        "name": item["name"],
-                        "path": item["path"],
-                        "type": "file"
-                    })
-                    
-            return structure
+        except httpx.HTTPStatusError:
+            raise HTTPException(status_code=400, detail="Failed to fetch repository contents")
 
-        directory_structure = await get_directory_contents()
-        
         return {
             "id": repo_data["id"],
             "name": repo_data["name"],
             "full_name": repo_data["full_name"],
             "default_branch": repo_data["default_branch"],
             "visibility": repo_data["private"] and "private" or "public",
-            "directory_structure": directory_structure
+            "head_sha": sha,
+            "tree_truncated": truncated,
+            # Subdirectories are loaded on demand from /{repo_id}/tree
+            "directory_structure": subtree(index, "", depth=1)
         }
+
+@router.get("/{repo_id}/tree")
+async def get_repository_tree(repo_id: int, path: str = "", depth: int = 1, offset: int = 0, limit: int = 500,
+                              current_user: dict = Depends(get_current_user)):
+    """
+    Serve part of a repository's directory tree on demand
+
+    Lists the items of `path` (the root by default), expanding subdirectories
+    `depth - 1` levels deeper, paged with `offset` and `limit`.
+    """
+    depth = max(1, min(depth, 10))
+    async with httpx.AsyncClient() as client:
+        repo_data = await fetch_repository(client, repo_id, current_user['github_token'])
+        try:
+            sha, index, truncated = await load_repository_tree(
+                client, repo_data["full_name"], repo_data["default_branch"], current_user['github_token']
+            )
+        except httpx.HTTPStatusError:
+            raise HTTPException(status_code=400, detail="Failed to fetch repository contents")
+
+    path = path.strip("/")
+    if path and path not in index:
+        raise HTTPException(status_code=404, detail="Directory not found")
+
+    return {
+        "path": path,
+        "sha": sha,
+        "truncated": truncated,
+        "total": len(index.get(path, [])),
+        "offset": offset,
+        "items": subtree(index, path, depth, offset, limit),
+    }
+
 @router.post("/read_docs")
 async def read_documentation(request: ReadDocsRequest):
     try:
@@ -166,18 +159,19 @@ async def read_documentation(request: ReadDocsRequest):
 
         async with httpx.AsyncClient() as client:
             headers = {
-                "Authorization": f"Bearer {github_token}",
                 "Accept": "application/vnd.github.v3.raw",
                 "X-GitHub-Api-Version": "2022-11-28"
             }
             
             # Fetch documentation.yaml
             docs_url = f"https://api.github.com/repos/{request.full_name}/contents/documentation.yaml?ref=doccie"
-            docs_response = await client.get(docs_url, headers=headers)
+            docs_response = await github_get(client, docs_url, github_token, headers=headers,
+                                             endpoint="/repos/{repo}/contents/documentation.yaml")
             
             # Fetch dependency.mermaid
             mermaid_url = f"https://api.github.com/repos/{request.full_name}/contents/dependency.mermaid?ref=doccie"
-            mermaid_response = await client.get(mermaid_url, headers=headers)
+            mermaid_response = await github_get(client, mermaid_url, github_token, headers=headers,
+                                                endpoint="/repos/{repo}/contents/dependency.mermaid")
             
             # Check for authentication errors
             if docs_response.status_code == 401 or mermaid_response.status_code == 401:
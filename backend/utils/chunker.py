@@ -0,0 +1,139 @@
+import re
+
+# Rough characters-per-token ratio of code for the models we run
+CHARS_PER_TOKEN = 4
+
+# Lines shared by every chunk of a file: router/app construction, path prefixes and
+# class-level route annotations first, then imports as far as the header budget allows
+ROUTER_LINE = re.compile(
+    r"\b(APIRouter|Blueprint|Flask|FastAPI|Router|express)\s*\("
+    r"|\b(prefix|url_prefix|basePath)\s*=|@(RequestMapping|RestController|Controller|Path|Route)\b"
+)
+IMPORT_LINE = re.compile(
+    r"^\s*(import\s|from\s+\S+\s+import\s|package\s|using\s|use\s|require[\s(]|#include\b|namespace\s)"
+    r"|\brequire\s*\("
+)
+
+# Lines that belong to the declaration that follows them
+PREFIX_LINE = re.compile(r"^\s*(@|#\[|\[[A-Z]|#(?!\[)|//|/\*|\*)")
+
+# Lines that continue the previous statement rather than starting a new one
+CONTINUATION_LINE = re.compile(r"^\s*([})\]]|else\b|elif\b|except\b|finally\b|catch\b|\.)")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def chunk_source(content, max_tokens, header_share=0.25):
+    """
+    Split source code into pieces under a token budget at declaration boundaries
+
+    Every piece starts with the file's header context (router setup and path
+    prefixes, then imports), so each can be analysed on its own. When the header
+    is over its share of the budget, imports are left out, never router lines.
+    Files that fit the budget come back whole.
+    """
+    if estimate_tokens(content) <= max_tokens:
+        return [content]
+
+    lines = content.splitlines()
+    header_budget = max_tokens * header_share
+    router_indexes = [i for i, line in enumerate(lines) if ROUTER_LINE.search(line)]
+    import_indexes = [i for i, line in enumerate(lines) if IMPORT_LINE.search(line) and not ROUTER_LINE.search(line)]
+
+    kept, header_tokens = set(), 0
+    for i in router_indexes + import_indexes:
+        tokens = estimate_tokens(lines[i])
+        if header_tokens + tokens > header_budget:
+            continue
+        kept.add(i)
+        header_tokens += tokens
+    header = "\n".join(lines[i] for i in sorted(kept))
+
+    # Router lines that did not fit the header stay in the body; imports left out of it are dropped
+    header_set = kept | set(import_indexes)
+    body_budget = max_tokens - estimate_tokens(header)
+    units = split_units(lines, 0, len(lines), body_budget, header_set)
+
+    chunks, current, current_tokens = [], [], 0
+    for start, end in units:
+        text = "\n".join(lines[i] for i in range(start, end) if i not in header_set)
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > body_budget:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+
+    return [f"{header}\n\n...\n\n" + "\n".join(chunk) for chunk in chunks]
+
+
+def line_indent(line):
+    return len(line) - len(line.lstrip())
+
+
+def split_units(lines, start, end, budget, header_set):
+    """
+    Split lines[start:end] into (start, end) ranges at the outermost indentation level
+
+    Ranges still over budget are split again one indentation level deeper, and
+    as a last resort by line count.
+    """
+    body = [i for i in range(start, end) if lines[i].strip() and i not in header_set]
+    if not body:
+        return [(start, end)]
+
+    starts = [i for i in body if not CONTINUATION_LINE.match(lines[i])] or body
+    indent = min(line_indent(lines[i]) for i in starts)
+    boundaries = [start]
+    previous_is_prefix = False
+    for i in body:
+        if line_indent(lines[i]) != indent or CONTINUATION_LINE.match(lines[i]):
+            continue
+        if i > start and not previous_is_prefix:
+            boundaries.append(i)
+        previous_is_prefix = bool(PREFIX_LINE.match(lines[i]))
+    boundaries.append(end)
+
+    units = []
+    for unit_start, unit_end in zip(boundaries, boundaries[1:]):
+        if unit_start == unit_end:
+            continue
+        text = "\n".join(lines[unit_start:unit_end])
+        if estimate_tokens(text) <= budget:
+            units.append((unit_start, unit_end))
+        elif len(boundaries) > 2 or unit_start != start:
+            units.extend(split_units(lines, unit_start, unit_end, budget, header_set))
+        else:
+            units.extend(split_by_deeper_indent(lines, unit_start, unit_end, budget, indent, header_set))
+    return units
+
+
+def split_by_deeper_indent(lines, start, end, budget, indent, header_set):
+    """A single declaration over budget: split its body, or fall back to fixed line windows"""
+    inner = [i for i in range(start + 1, end) if lines[i].strip() and line_indent(lines[i]) > indent]
+    if inner:
+        deeper_start = inner[0]
+        candidate = split_units(lines, deeper_start, end, budget, header_set)
+        if len(candidate) > 1:
+            return [(start, deeper_start)] + candidate
+
+    window = max(1, budget * CHARS_PER_TOKEN // max(1, max(len(line) for line in lines[start:end]) + 1))
+    return [(i, min(i + window, end)) for i in range(start, end, window)]
+
+
+def merge_endpoint_results(results):
+    """Merge the {"endpoints": [...]} results of several chunks, de-duplicating by method and path"""
+    merged = {}
+    for result in results:
+        for endpoint in (result or {}).get("endpoints", []):
+            if not isinstance(endpoint, dict):
+                continue
+            key = (str(endpoint.get("method", "")).upper(), endpoint.get("path"))
+            existing = merged.get(key)
+            if existing is None or len(endpoint.get("parameters") or []) > len(existing.get("parameters") or []):
+                merged[key] = endpoint
+    return {"endpoints": list(merged.values())}
@@ -0,0 +1,99 @@
+import contextlib
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling a dependency that keeps failing, and probe it before trusting it again
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail at once with CircuitOpenError. Once `reset_timeout` seconds have passed
+    it is half-open: a single probe call goes through, closing the circuit on
+    success or reopening it on failure. Exceptions for which `is_failure` is
+    false (e.g. a malformed answer) say nothing about availability and count as
+    successes.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, is_failure=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure or (lambda error: True)
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.counters = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    def is_open(self):
+        """Whether calls are currently rejected, without claiming the half-open probe"""
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def raise_if_open(self):
+        if self.is_open():
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def allow(self):
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    @contextlib.contextmanager
+    def guard(self):
+        """Wrap one call to the dependency; usable around awaits as well as blocking calls"""
+        if not self.allow():
+            self.counters["rejected"] += 1
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        self.counters["calls"] += 1
+        probing = self.state == "half_open"
+        try:
+            yield
+        except Exception as e:
+            if self.is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled: no verdict, but let another call probe
+            if probing:
+                self.probe_in_flight = False
+            raise
+        else:
+            self.record_success()
+
+    def record_success(self):
+        if self.state != "closed":
+            print(f"{self.name} circuit closed")
+        self.state = "closed"
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.counters["failures"] += 1
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+            if self.state == "closed":
+                self.counters["opened"] += 1
+                print(f"{self.name} circuit opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self):
+        return {
+            "state": "half_open" if self.state == "open" and not self.is_open() else self.state,
+            "consecutive_failures": self.failures,
+            "open_for": time.monotonic() - self.opened_at if self.state == "open" else None,
+            **self.counters,
+        }
@@ -0,0 +1,231 @@
+import asyncio
+import collections
+import contextlib
+import contextvars
+import heapq
+import itertools
+import math
+import time
+
+# (tenant, repository) whose work the current task is doing; set once per generation
+# run and inherited by every task it spawns
+current_flow = contextvars.ContextVar("current_flow", default=None)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for calls to a model backend, tuned with AIMD
+
+    The limit grows by one slot per round of successful calls (additive increase)
+    and is halved on overload signals such as timeouts, 429s and 5xx responses, or
+    when latency climbs well above the best observed latency for calls of a
+    similar size (multiplicative decrease). It always stays within
+    [min_limit, max_limit].
+
+    Model calls have a large fixed cost, so latency is not proportional to the
+    prompt size: it is only compared within half-octave size classes, where
+    size alone changes it by at most ~1.4x.
+
+    Wrap each call in `async with limiter.slot():`; exceptions raised inside the
+    block are classified with `is_overload`.
+
+    Waiting calls are served by start-time fair queuing over (tenant, repository)
+    flows rather than first come, first served: each tenant gets capacity in
+    proportion to its weight, split evenly across its active repositories, so a
+    large run cannot starve small ones.
+
+    State is per process. Processes that share backends must each be given
+    a share of the capacity (see `resize`). Fair queuing does not work across
+    processes.
+    """
+
+    def __init__(self, min_limit=1, max_limit=8, initial_limit=None, latency_tolerance=2.0,
+                 backoff=0.5, decrease_window=5.0, is_overload=None, tenant_weights=None):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit or self.min_limit, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.is_overload = is_overload or (lambda error: isinstance(error, asyncio.TimeoutError))
+
+        self.in_flight = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.tenant_weights = tenant_weights or {}
+        self.virtual_time = 0.0
+        self.flow_finish = {}
+        self.flow_active = collections.Counter()
+        self.tenant_waits = {}
+        self.baselines = {}
+        self.last_latency = None
+        self.last_decrease = 0.0
+        self.decrease_window = decrease_window
+        self.counters = {"calls": 0, "overloads": 0, "slow_calls": 0, "increases": 0, "decreases": 0}
+
+    @contextlib.asynccontextmanager
+    async def slot(self, cost=1.0, flow=None):
+        """
+        Hold one slot for the duration of a call and feed its outcome back into the limit
+
+        `cost` (e.g. the prompt's estimated token count) picks the size class the
+        latency is compared in, so a large input is not mistaken for an
+        overloaded backend, and is what fair queuing charges the flow for.
+        `flow` defaults to `current_flow`.
+        """
+        cost = max(cost, 1.0)
+        flow = flow or current_flow.get() or ("default", "default")
+        self.flow_active[flow] += 1
+        try:
+            await self.acquire(cost, flow)
+        except BaseException:
+            self.leave_flow(flow)
+            raise
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.is_overload(e):
+                self.record_overload()
+            else:
+                self.record_latency(time.monotonic() - started, cost)
+            raise
+        else:
+            self.record_latency(time.monotonic() - started, cost)
+        finally:
+            self.leave_flow(flow)
+            self.release()
+
+    def flow_weight(self, flow):
+        tenant = flow[0]
+        repositories = sum(1 for other in self.flow_active if other[0] == tenant) or 1
+        return float(self.tenant_weights.get(str(tenant), 1.0)) / repositories
+
+    def leave_flow(self, flow):
+        self.flow_active[flow] -= 1
+        if self.flow_active[flow] <= 0:
+            del self.flow_active[flow]
+
+    async def acquire(self, cost=1.0, flow=("default", "default")):
+        # Start and finish tags in virtual time: a flow is charged cost / weight per call
+        start = max(self.virtual_time, self.flow_finish.get(flow, 0.0))
+        self.flow_finish[flow] = start + cost / self.flow_weight(flow)
+        enqueued = time.monotonic()
+
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            self.record_wait(flow, 0.0)
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (start, next(self.sequence), waiter, flow)
+        heapq.heappush(self.waiters, entry)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before cancellation: give it back
+                self.release()
+            elif entry in self.waiters:
+                self.waiters.remove(entry)
+                heapq.heapify(self.waiters)
+            raise
+        self.record_wait(flow, time.monotonic() - enqueued)
+
+    def record_wait(self, flow, wait):
+        waits = self.tenant_waits.setdefault(str(flow[0]), {"calls": 0, "wait_total": 0.0, "wait_max": 0.0})
+        waits["calls"] += 1
+        waits["wait_total"] += wait
+        waits["wait_max"] = max(waits["wait_max"], wait)
+
+    def release(self):
+        self.in_flight -= 1
+        self.wake_waiters()
+
+    def wake_waiters(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            start, _, waiter, _ = heapq.heappop(self.waiters)
+            if not waiter.done():
+                self.virtual_time = max(self.virtual_time, start)
+                self.in_flight += 1
+                waiter.set_result(None)
+        if len(self.flow_finish) > 256:
+            # Finish tags at or behind virtual time no longer affect anyone's order
+            self.flow_finish = {flow: finish for flow, finish in self.flow_finish.items()
+                                if finish > self.virtual_time}
+
+    def resize(self, min_limit, max_limit):
+        """Change the bounds, e.g. when model backends join or leave; the current limit scales with the upper bound"""
+        scale = max_limit / self.max_limit
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(max(self.limit * scale, self.min_limit), self.max_limit)
+        self.wake_waiters()
+
+    @staticmethod
+    def size_class(cost):
+        return int(2 * math.log2(max(cost, 1.0)))
+
+    def expected_latency(self, cost):
+        """Best observed latency for calls of this cost, scaled from the nearest size class; None if none seen yet"""
+        if not self.baselines:
+            return None
+        wanted = self.size_class(cost)
+        nearest = min(self.baselines, key=lambda size_class: abs(size_class - wanted))
+        # Scaling by size overestimates the fixed part, which only matters across classes
+        return self.baselines[nearest] * 2 ** ((wanted - nearest) / 2)
+
+    def record_latency(self, latency, cost=1.0):
+        self.counters["calls"] += 1
+        self.last_latency = latency
+        size_class = self.size_class(cost)
+        baseline = self.baselines.get(size_class)
+        if baseline is None or latency < baseline:
+            self.baselines[size_class] = latency
+        else:
+            # Let the baseline drift up slowly so a permanently slower model is not treated as overload forever
+            self.baselines[size_class] += (latency - baseline) * 0.01
+
+        if baseline is not None and latency > baseline * self.latency_tolerance:
+            self.counters["slow_calls"] += 1
+            self.decrease()
+        elif self.in_flight >= int(self.limit):
+            # Only grow while the current limit is actually in use
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.counters["increases"] += 1
+        self.wake_waiters()
+
+    def record_overload(self):
+        self.counters["calls"] += 1
+        self.counters["overloads"] += 1
+        self.decrease()
+
+    def decrease(self):
+        # Calls started before the last decrease report the old congestion: back off at most once per window
+        now = time.monotonic()
+        window = self.decrease_window
+        if now - self.last_decrease < window:
+            return
+        self.last_decrease = now
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+        self.counters["decreases"] += 1
+
+    def stats(self):
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self.waiters),
+            "baseline_latencies": {f"{round(2 ** (size_class / 2))}+ tokens": latency
+                                   for size_class, latency in sorted(self.baselines.items())},
+            "last_latency": self.last_latency,
+            **self.counters,
+            "tenants": {
+                tenant: {"calls": waits["calls"], "wait_avg": waits["wait_total"] / waits["calls"],
+                         "wait_max": waits["wait_max"],
+                         "queued": sum(1 for entry in self.waiters if str(entry[3][0]) == tenant)}
+                for tenant, waits in self.tenant_waits.items()
+            },
+        }
@@ -0,0 +1,368 @@
+import asyncio
+import base64
+import collections
+import contextvars
+import hashlib
+import heapq
+import itertools
+import json
+import os
+import time
+
+import httpx
+
+# Number of GitHub responses kept in memory, least recently used evicted first
+GITHUB_CACHE_SIZE = int(os.getenv("GITHUB_CACHE_SIZE", 1024))
+
+# Optional directory for a second, on-disk cache tier that survives restarts and is shared by workers
+GITHUB_CACHE_DIR = os.getenv("GITHUB_CACHE_DIR")
+
+# Response headers kept with a cached body; the rest describe the original exchange only
+KEPT_HEADERS = ("content-type", "etag", "last-modified", "link")
+
+# Requests in flight at once per token; GitHub's secondary limits punish large bursts
+GITHUB_MAX_CONCURRENCY = int(os.getenv("GITHUB_MAX_CONCURRENCY", 8))
+
+# Part of each token's hourly budget that background generation leaves for interactive calls
+GITHUB_BACKGROUND_RESERVE = int(os.getenv("GITHUB_BACKGROUND_RESERVE", 500))
+
+# Below this many remaining requests, calls are spread evenly over the rest of the rate limit window
+GITHUB_PACE_BELOW = int(os.getenv("GITHUB_PACE_BELOW", 1000))
+
+# Retries of rate-limited requests, and the longest server-advised wait worth retrying after
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", 3))
+GITHUB_MAX_BACKOFF = float(os.getenv("GITHUB_MAX_BACKOFF", 300))
+
+# Longest an interactive call waits for its token's budget; past that it gets a 429 at once instead of hanging
+GITHUB_INTERACTIVE_MAX_WAIT = float(os.getenv("GITHUB_INTERACTIVE_MAX_WAIT", 10))
+
+# Waiting calls are served in priority order: UI requests before generation runs
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Priority of the GitHub calls the current task makes; generation runs set BACKGROUND
+github_priority = contextvars.ContextVar("github_priority", default=INTERACTIVE)
+
+
+class ResponseCache:
+    """
+    Least recently used cache of GitHub GET responses, with an optional disk tier
+
+    Entries are keyed by (token hash, URL, Accept header): the same URL can
+    answer differently per user and per media type, and tokens are never
+    stored in the clear.
+    """
+
+    def __init__(self, max_entries=GITHUB_CACHE_SIZE, directory=GITHUB_CACHE_DIR):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.entries = collections.OrderedDict()
+        self.endpoints = collections.defaultdict(lambda: {"requests": 0, "hits": 0, "misses": 0, "uncacheable": 0})
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(token, url, accept):
+        token_hash = hashlib.sha256((token or "").encode()).hexdigest()
+        return hashlib.sha256(f"{token_hash}\n{url}\n{accept}".encode()).hexdigest()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            return entry
+        if not self.directory:
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{key}.json")) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self.remember(key, entry)
+        if self.directory:
+            path = os.path.join(self.directory, f"{key}.json")
+            try:
+                with open(f"{path}.tmp", "w") as f:
+                    json.dump(entry, f)
+                os.replace(f"{path}.tmp", path)
+            except OSError as e:
+                print(f"Could not write GitHub cache entry: {e}")
+
+    def remember(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "disk": bool(self.directory),
+            "endpoints": {
+                endpoint: {**counts, "hit_rate": counts["hits"] / counts["requests"] if counts["requests"] else None}
+                for endpoint, counts in self.endpoints.items()
+            },
+        }
+
+
+response_cache = ResponseCache()
+
+
+class TokenBudget:
+    """Rate limit state GitHub last reported for one token, and the calls waiting on it"""
+
+    def __init__(self):
+        self.limit = None
+        self.remaining = None
+        self.reset = 0.0
+        self.blocked_until = 0.0
+        self.last_start = 0.0
+        self.in_flight = 0
+        self.waiters = []
+        self.changed = asyncio.Condition()
+
+    def update(self, headers):
+        # Search and GraphQL have their own budgets; everything here spends the core one
+        if headers.get("x-ratelimit-resource", "core") != "core" or "x-ratelimit-remaining" not in headers:
+            return
+        self.remaining = int(headers["x-ratelimit-remaining"])
+        self.limit = int(headers.get("x-ratelimit-limit", self.limit or 0)) or None
+        self.reset = float(headers.get("x-ratelimit-reset", self.reset))
+
+
+class RateLimitScheduler:
+    """
+    Send GitHub requests within each token's rate limit
+
+    Every token has its own budget, read back from the X-RateLimit headers of
+    its responses. Calls wait in priority order (INTERACTIVE before
+    BACKGROUND, oldest first within a priority) for a free slot and for the
+    budget: background calls stop `background_reserve` requests short of the
+    limit until it resets, and once fewer than `pace_below` remain, calls are
+    spaced out so the rest lasts until the reset. Responses that hit a
+    primary or secondary limit block the token for the server-advised time
+    (Retry-After, else the reset time) and are retried. Only background calls
+    wait out a long block: interactive calls that would wait more than
+    `interactive_max_wait` get a 429 response straight away.
+    """
+
+    def __init__(self, max_concurrency=GITHUB_MAX_CONCURRENCY, background_reserve=GITHUB_BACKGROUND_RESERVE,
+                 pace_below=GITHUB_PACE_BELOW, max_retries=GITHUB_MAX_RETRIES, max_backoff=GITHUB_MAX_BACKOFF,
+                 interactive_max_wait=GITHUB_INTERACTIVE_MAX_WAIT):
+        self.max_concurrency = max_concurrency
+        self.interactive_max_wait = interactive_max_wait
+        self.background_reserve = background_reserve
+        self.pace_below = pace_below
+        self.max_retries = max_retries
+        self.max_backoff = max_backoff
+        self.budgets = {}
+        self.sequence = itertools.count()
+        self.counters = {"requests": 0, "delayed": 0, "rate_limited": 0, "retries": 0, "refused": 0}
+        self.waits = {INTERACTIVE: [0, 0.0], BACKGROUND: [0, 0.0]}
+
+    def budget(self, authorization):
+        key = hashlib.sha256(authorization.encode()).hexdigest()[:12]
+        if key not in self.budgets:
+            self.budgets[key] = TokenBudget()
+        return self.budgets[key]
+
+    def delay(self, budget, priority):
+        """Seconds before a call of this priority may start, 0 if it may start now"""
+        now = time.time()
+        if budget.blocked_until > now:
+            return budget.blocked_until - now
+        if budget.remaining is None or budget.reset <= now:
+            return 0.0
+        usable = budget.remaining - budget.in_flight - (self.background_reserve if priority == BACKGROUND else 0)
+        if usable <= 0:
+            return budget.reset - now + 1.0
+        if usable < self.pace_below:
+            return max(0.0, budget.last_start + (budget.reset - now) / usable - now)
+        return 0.0
+
+    async def acquire(self, budget, priority):
+        """Wait for a slot within the budget; returns False if an interactive call would wait too long"""
+        entry = (priority, next(self.sequence))
+        enqueued = time.monotonic()
+        # Interactive calls give up at their deadline; background calls wait for as long as it takes
+        deadline = enqueued + self.interactive_max_wait if priority == INTERACTIVE else None
+        async with budget.changed:
+            heapq.heappush(budget.waiters, entry)
+            budget.changed.notify_all()
+            try:
+                delayed = False
+                while True:
+                    timeout = None if deadline is None else deadline - time.monotonic()
+                    if budget.waiters[0] == entry and budget.in_flight < self.max_concurrency:
+                        delay = self.delay(budget, priority)
+                        if delay <= 0:
+                            break
+                        if timeout is not None and delay > timeout:
+                            self.counters["refused"] += 1
+                            return False
+                        delayed = True
+                        try:
+                            await asyncio.wait_for(budget.changed.wait(), delay)
+                        except asyncio.TimeoutError:
+                            pass
+                    else:
+                        if timeout is not None and timeout <= 0:
+                            self.counters["refused"] += 1
+                            return False
+                        try:
+                            await asyncio.wait_for(budget.changed.wait(), timeout)
+                        except asyncio.TimeoutError:
+                            pass
+            finally:
+                budget.waiters.remove(entry)
+                heapq.heapify(budget.waiters)
+                budget.changed.notify_all()
+            budget.in_flight += 1
+            budget.last_start = time.time()
+        self.counters["delayed"] += delayed
+        self.waits[priority][0] += 1
+        self.waits[priority][1] += time.monotonic() - enqueued
+        return True
+
+    def refusal(self, budget, request):
+        """429 response for an interactive call that would have to wait for the rate limit to reset"""
+        retry_after = max(budget.blocked_until, budget.reset if budget.remaining is not None else 0.0) - time.time()
+        return httpx.Response(
+            429,
+            headers={"retry-after": str(max(1, int(retry_after))), "x-ratelimit-remaining": "0",
+                     "x-ratelimit-reset": str(int(budget.reset))},
+            json={"message": "GitHub API rate limit exceeded, try again later"},
+            request=request,
+        )
+
+    async def release(self, budget):
+        async with budget.changed:
+            budget.in_flight -= 1
+            budget.changed.notify_all()
+
+    def backoff(self, response, attempt):
+        """Seconds to wait before retrying a rate-limited response, or None if it was not rate limited"""
+        if response.status_code not in (403, 429):
+            return None
+        if "retry-after" in response.headers:
+            return float(response.headers["retry-after"])
+        if response.headers.get("x-ratelimit-remaining") == "0":
+            return max(0.0, float(response.headers.get("x-ratelimit-reset", 0)) - time.time()) + 1.0
+        if response.status_code == 429:
+            # Secondary limit without advice: wait at least a minute, longer on each retry
+            return 60.0 * 2 ** attempt
+        return None
+
+    async def send(self, client, request, stream=False):
+        budget = self.budget(request.headers.get("Authorization", ""))
+        priority = github_priority.get()
+        max_backoff = self.max_backoff if priority == BACKGROUND else min(self.max_backoff, self.interactive_max_wait)
+        for attempt in itertools.count():
+            if not await self.acquire(budget, priority):
+                return self.refusal(budget, request)
+            self.counters["requests"] += 1
+            try:
+                response = await client.send(request, stream=stream)
+            finally:
+                await self.release(budget)
+            budget.update(response.headers)
+
+            wait = self.backoff(response, attempt)
+            if wait is None:
+                return response
+            self.counters["rate_limited"] += 1
+            budget.blocked_until = max(budget.blocked_until, time.time() + wait)
+            print(f"GitHub rate limit hit ({response.status_code}), backing off {wait:.0f}s")
+            if attempt >= self.max_retries or wait > max_backoff:
+                return response
+            self.counters["retries"] += 1
+            await response.aclose()
+
+    def stats(self):
+        now = time.time()
+        return {
+            **self.counters,
+            "wait_avg": {name: (self.waits[priority][1] / self.waits[priority][0] if self.waits[priority][0] else None)
+                         for name, priority in (("interactive", INTERACTIVE), ("background", BACKGROUND))},
+            "tokens": {
+                key: {"remaining": budget.remaining, "limit": budget.limit,
+                      "reset_in": max(0.0, budget.reset - now) if budget.remaining is not None else None,
+                      "blocked_for": max(0.0, budget.blocked_until - now),
+                      "in_flight": budget.in_flight, "queued": len(budget.waiters)}
+                for key, budget in self.budgets.items()
+            },
+        }
+
+
+rate_limiter = RateLimitScheduler()
+
+
+async def github_send(client, request, stream=False):
+    """
+    Send a built request through the rate limit scheduler
+
+    Rate-limited responses are retried after the advised wait; the final
+    response is returned whatever its status, as httpx would.
+    """
+    return await rate_limiter.send(client, request, stream=stream)
+
+
+async def github_request(client, method, url, **kwargs):
+    """client.request(), but scheduled against the token's rate limit"""
+    return await github_send(client, client.build_request(method, url, **kwargs))
+
+
+def cached_response(entry, request):
+    return httpx.Response(
+        entry["status"],
+        headers=entry["headers"],
+        content=base64.b64decode(entry["content"]),
+        request=request,
+    )
+
+
+async def github_get(client, url, token, headers=None, params=None, endpoint=None):
+    """
+    GET a GitHub API URL through the shared conditional-request cache
+
+    A cached response is revalidated with If-None-Match / If-Modified-Since; on a
+    304 (which GitHub does not count against the rate limit) the cached body is
+    returned as a 200 response, so callers handle both cases the same way.
+    `endpoint` names the resource for per-endpoint hit rates and defaults to the
+    URL path.
+
+    :param client: httpx.AsyncClient to send the request with
+    :return: httpx.Response
+    """
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json", **(headers or {})}
+    request = client.build_request("GET", url, headers=headers, params=params)
+    counts = response_cache.endpoints[endpoint or request.url.path]
+    counts["requests"] += 1
+
+    key = response_cache.key(token, str(request.url), headers["Accept"])
+    entry = response_cache.get(key)
+    if entry is not None:
+        if entry["headers"].get("etag"):
+            request.headers["If-None-Match"] = entry["headers"]["etag"]
+        if entry["headers"].get("last-modified"):
+            request.headers["If-Modified-Since"] = entry["headers"]["last-modified"]
+
+    response = await github_send(client, request)
+    if response.status_code == 304 and entry is not None:
+        counts["hits"] += 1
+        return cached_response(entry, request)
+
+    if response.status_code == 200 and ("etag" in response.headers or "last-modified" in response.headers):
+        counts["misses"] += 1
+        response_cache.put(key, {
+            "status": 200,
+            "headers": {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers},
+            "content": base64.b64encode(await response.aread()).decode(),
+        })
+    else:
+        counts["uncacheable"] += 1
+    return response
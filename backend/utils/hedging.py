@@ -0,0 +1,102 @@
+import asyncio
+import collections
+import time
+
+from utils.concurrency import AdaptiveLimiter
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Hedger:
+    """
+    Duplicate calls that run longer than most recent calls did
+
+    When a call outlives the `percentile` of recent latencies of calls of a
+    similar cost, a second attempt is started. Latencies are kept per
+    half-octave size class, as the limiter's baselines are, since model calls
+    have a large fixed cost and do not scale with the prompt size. A class with
+    too few samples borrows from the nearest class that has enough. The
+    winning attempt is whichever returns a valid result first; whichever returns a valid result first wins and the other is
+    cancelled. Hedges are limited to `max_ratio` of calls, with bursts of up to
+    `burst` hedges for stalls that come together, so a backend that is slow
+    across the board is not handed double the load.
+    """
+
+    def __init__(self, percentile=0.95, max_ratio=0.1, min_samples=20, window=200, warmup_poll=0.1,
+                 burst=5):
+        self.percentile = percentile
+        self.warmup_poll = warmup_poll
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.window = window
+        self.latencies = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self.budget = 1.0
+        self.burst = max(1.0, burst)
+        self.counters = {"calls": 0, "hedges": 0, "hedge_wins": 0, "skipped_for_budget": 0}
+
+    def delay(self, cost):
+        """Seconds to wait before hedging a call of this cost, or None while too little is known"""
+        known = [size_class for size_class, values in self.latencies.items() if len(values) >= self.min_samples]
+        if not known:
+            return None
+        wanted = AdaptiveLimiter.size_class(cost)
+        nearest = min(known, key=lambda size_class: abs(size_class - wanted))
+        return percentile(self.latencies[nearest], self.percentile) * 2 ** ((wanted - nearest) / 2)
+
+    async def run(self, attempt, cost=1.0):
+        """
+        Run `attempt(index)` and hedge it with `attempt(1)` if it is slow
+
+        `attempt` must raise on invalid results, so a failed or malformed
+        response never wins over a slower valid one.
+        """
+        cost = max(cost, 1.0)
+        self.counters["calls"] += 1
+        self.budget = min(self.budget + self.max_ratio, self.burst)
+        started = time.monotonic()
+        primary = asyncio.ensure_future(attempt(0))
+        pending = {primary}
+        try:
+            delay = self.delay(cost)
+            while delay is None and not primary.done():
+                # Calls that start before enough latencies are known get hedged once they are
+                await asyncio.wait(pending, timeout=self.warmup_poll)
+                delay = self.delay(cost)
+            if not primary.done():
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, delay - (time.monotonic() - started)))
+                if not done:
+                    if self.budget >= 1.0:
+                        self.budget -= 1.0
+                        self.counters["hedges"] += 1
+                        pending.add(asyncio.ensure_future(attempt(1)))
+                    else:
+                        self.counters["skipped_for_budget"] += 1
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.counters["hedge_wins"] += 1
+                        self.latencies[AdaptiveLimiter.size_class(cost)].append(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self):
+        return {
+            "percentile": self.percentile,
+            "max_ratio": self.max_ratio,
+            "latencies": {f"{round(2 ** (size_class / 2))}+ tokens": {"p50": percentile(values, 0.5),
+                                                                     "p99": percentile(values, 0.99),
+                                                                     "samples": len(values)}
+                          for size_class, values in sorted(self.latencies.items())},
+            **self.counters,
+        }
@@ -0,0 +1,123 @@
+import asyncio
+import contextlib
+import time
+
+import aiohttp
+
+
+class ModelBackend:
+    """One Ollama host and its routing state"""
+
+    def __init__(self, url):
+        self.url = url
+        # Health probes go to /api/tags on the same host
+        self.base_url = url.split("/api/")[0].rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.latency = None
+        self.last_error = None
+        self.counters = {"requests": 0, "errors": 0, "ejections": 0, "reinstatements": 0}
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "latency": self.latency,
+            "last_error": self.last_error,
+            **self.counters,
+        }
+
+
+class ModelPool:
+    """
+    Route model calls across several backends
+
+    Each call goes to the healthy backend with the fewest outstanding requests
+    (ties broken by recent latency). A backend is ejected after
+    `failure_threshold` consecutive failures or a failed health probe, and
+    reinstated once a probe of /api/tags succeeds again. `on_health_change` is
+    called with the number of healthy backends whenever it changes.
+    """
+
+    def __init__(self, urls, probe_interval=10.0, probe_timeout=5.0, failure_threshold=3,
+                 is_failure=None, on_health_change=None):
+        if not urls:
+            raise ValueError("At least one model backend URL is required")
+        self.backends = [ModelBackend(url) for url in urls]
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.failure_threshold = failure_threshold
+        self.is_failure = is_failure or (lambda error: isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError)))
+        self.on_health_change = on_health_change
+        self.probe_task = None
+
+    def healthy_count(self):
+        return sum(1 for backend in self.backends if backend.healthy)
+
+    def choose(self, exclude=()):
+        candidates = [backend for backend in self.backends if backend.healthy and backend not in exclude]
+        if not candidates:
+            # Everything is down: keep trying rather than failing every call until a probe succeeds
+            candidates = [backend for backend in self.backends if backend not in exclude] or self.backends
+        return min(candidates, key=lambda backend: (backend.outstanding, backend.latency or 0.0))
+
+    @contextlib.asynccontextmanager
+    async def use(self, exclude=()):
+        """Pick a backend for one call and account for its outcome"""
+        self.ensure_probing()
+        backend = self.choose(exclude)
+        backend.outstanding += 1
+        backend.counters["requests"] += 1
+        started = time.monotonic()
+        try:
+            yield backend
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            backend.counters["errors"] += 1
+            backend.last_error = str(e) or type(e).__name__
+            if self.is_failure(e):
+                backend.consecutive_failures += 1
+                if backend.consecutive_failures >= self.failure_threshold:
+                    self.set_health(backend, False)
+            raise
+        else:
+            elapsed = time.monotonic() - started
+            backend.latency = elapsed if backend.latency is None else backend.latency * 0.8 + elapsed * 0.2
+            backend.consecutive_failures = 0
+        finally:
+            backend.outstanding -= 1
+
+    def set_health(self, backend, healthy):
+        if backend.healthy == healthy:
+            return
+        backend.healthy = healthy
+        backend.consecutive_failures = 0
+        backend.counters["reinstatements" if healthy else "ejections"] += 1
+        print(f"Model backend {backend.url} {'reinstated' if healthy else 'ejected'}")
+        if self.on_health_change:
+            self.on_health_change(self.healthy_count())
+
+    def ensure_probing(self):
+        if self.probe_task is None or self.probe_task.done():
+            self.probe_task = asyncio.ensure_future(self.probe_forever())
+
+    async def probe_forever(self):
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.probe_timeout)) as session:
+            while True:
+                await asyncio.gather(*(self.probe(session, backend) for backend in self.backends))
+                await asyncio.sleep(self.probe_interval)
+
+    async def probe(self, session, backend):
+        try:
+            async with session.get(f"{backend.base_url}/api/tags") as response:
+                response.raise_for_status()
+            self.set_health(backend, True)
+        except Exception as e:
+            backend.last_error = f"probe: {str(e) or type(e).__name__}"
+            self.set_health(backend, False)
+
+    def stats(self):
+        return {"healthy": self.healthy_count(), "backends": [backend.stats() for backend in self.backends]}
@@ -0,0 +1,148 @@
+from utils.chunker import estimate_tokens
+
+# Static instructions sent as the system prompt, so every request shares the same prefix
+# and Ollama can reuse its evaluated KV cache instead of re-reading them per file
+ANALYSE_SYSTEM_PROMPT = """You are an expert API documentation generator. Analyze the code the user sends and extract detailed API endpoint information. Focus on:
+1. Complete endpoint paths
+2. HTTP methods (GET, POST, PUT, DELETE, etc.)
+3. Request parameters (query params, path params, request body)
+4. Response structure
+5. Authentication requirements
+6. Purpose/description of each endpoint
+
+Return a JSON object of the form {"endpoints": [{"path": "/example", "method": "GET", "parameters": [], "description": "Description of endpoint"}]}.
+
+Important:
+- Extract only actual API endpoints from the code
+- Include all parameters, whether they're in the URL, query string, or request body
+- Provide accurate response structures based on the code
+- Include authentication requirements if specified
+- Ensure the description clearly explains the endpoint's purpose
+- If you can't determine certain details, use reasonable defaults based on the code context
+- Return {"endpoints": []} when the code defines no endpoints"""
+
+BATCH_SYSTEM_PROMPT = """You are an expert API documentation generator. The user sends several separate source files, each between "===== FILE: <path> =====" and "===== END FILE: <path> =====" markers. Analyze each file independently and extract detailed API endpoint information: complete endpoint paths, HTTP methods, request parameters (query params, path params, request body), response structure, authentication requirements and the purpose of each endpoint.
+
+Return a JSON object with one entry per input file, keyed by the exact file path from its marker: {"files": {"<file path>": {"endpoints": [{"path": "/example", "method": "GET", "parameters": [], "description": "Description of endpoint"}]}}}.
+
+Important:
+- Include every input file as a key, with an empty "endpoints" list if it defines no endpoints
+- Never attribute an endpoint to a file other than the one it is defined in
+- Extract only actual API endpoints from the code
+- Include all parameters, whether they're in the URL, query string, or request body
+- Include authentication requirements if specified"""
+
+PARAMETER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "in": {"type": "string", "enum": ["path", "query", "header", "cookie", "body", "form"]},
+        "type": {"type": "string"},
+        "required": {"type": "boolean"},
+    },
+    "required": ["name", "in"],
+}
+
+ENDPOINT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "endpoints": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "path": {"type": "string"},
+                    "method": {"type": "string", "enum": ["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"]},
+                    "parameters": {"type": "array", "items": PARAMETER_SCHEMA},
+                    "description": {"type": "string"},
+                    "authentication": {"type": "string"},
+                    "response": {"type": "object"},
+                },
+                "required": ["path", "method", "description"],
+            },
+        },
+    },
+    "required": ["endpoints"],
+}
+
+BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {"files": {"type": "object", "additionalProperties": ENDPOINT_SCHEMA}},
+    "required": ["files"],
+}
+
+# "legacy" is the original request: instructions and code in one prompt, model defaults.
+# The others send a system prompt, keep the model loaded between calls, cap the output and
+# constrain it with a JSON schema. num_ctx is fixed per profile: Ollama reloads the model
+# whenever it changes, which would throw away keep_alive and the cached system prompt.
+PROFILES = {
+    "legacy": {"system_prompt": False},
+    "structured": {
+        "system_prompt": True,
+        "keep_alive": "30m",
+        "schema": True,
+        "num_predict": 1024,
+        "num_ctx": 8192,
+        "temperature": 0,
+    },
+    "fast": {
+        "system_prompt": True,
+        "keep_alive": "30m",
+        "schema": True,
+        "num_predict": 512,
+        "num_ctx": 4096,
+        "temperature": 0,
+    },
+}
+
+
+def get_profile(name):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown Ollama profile {name!r}, expected one of {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def output_tokens(profile, files=1):
+    """
+    Output cap of a call; batched calls answer for several files, but never get more than half the context
+
+    `files=None` stands for a batch of any size, i.e. the largest cap.
+    """
+    if files is None:
+        return profile["num_ctx"] // 2
+    return min(profile["num_predict"] * files, profile["num_ctx"] // 2)
+
+
+def input_tokens(profile, system, files=1):
+    """Prompt tokens that fit in the profile's context next to the system prompt and the output, None if unbounded"""
+    if not profile.get("num_ctx"):
+        return None
+    return profile["num_ctx"] - estimate_tokens(system) - output_tokens(profile, files)
+
+
+def build_request(profile, model, system, prompt, schema, files=1):
+    """
+    Body of an /api/generate call for a profile
+
+    `system` and `prompt` are the static instructions and the per-call input;
+    the legacy profile sends `prompt` alone, which then has to carry the
+    instructions itself. `files` scales the output cap of batched calls.
+    """
+    if not profile.get("system_prompt"):
+        return {"model": model, "format": "json", "stream": False, "prompt": prompt}
+
+    body = {
+        "model": model,
+        "system": system,
+        "prompt": prompt,
+        "format": schema if profile.get("schema") else "json",
+        "stream": False,
+        "options": {
+            "num_ctx": profile["num_ctx"],
+            "num_predict": output_tokens(profile, files),
+            "temperature": profile.get("temperature", 0),
+        },
+    }
+    if profile.get("keep_alive"):
+        body["keep_alive"] = profile["keep_alive"]
+    return body
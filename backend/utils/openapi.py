@@ -0,0 +1,408 @@
+import re
+import yaml
+
+OPENAPI_VERSION = "3.0.3"
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+PARAMETER_LOCATIONS = ("query", "header", "path", "cookie")
+BODY_LOCATIONS = ("body", "form", "formdata", "requestbody", "json", "file")
+
+# Type names seen in extracted endpoints, across languages, mapped to OpenAPI schemas
+TYPE_SCHEMAS = {
+    "str": {"type": "string"}, "string": {"type": "string"}, "text": {"type": "string"},
+    "int": {"type": "integer"}, "integer": {"type": "integer"}, "long": {"type": "integer", "format": "int64"},
+    "float": {"type": "number"}, "double": {"type": "number"}, "number": {"type": "number"},
+    "decimal": {"type": "number"},
+    "bool": {"type": "boolean"}, "boolean": {"type": "boolean"},
+    "list": {"type": "array", "items": {}}, "array": {"type": "array", "items": {}},
+    "dict": {"type": "object"}, "object": {"type": "object"}, "json": {"type": "object"},
+    "uploadfile": {"type": "string", "format": "binary"}, "file": {"type": "string", "format": "binary"},
+    "date": {"type": "string", "format": "date"}, "datetime": {"type": "string", "format": "date-time"},
+    "uuid": {"type": "string", "format": "uuid"},
+}
+
+# Flask <int:id>, Express :id and regex-free {id} forms of path parameters
+FLASK_PARAM = re.compile(r"<(?:[^:<>]+:)?([^<>]+)>")
+COLON_PARAM = re.compile(r"(?<=/):([A-Za-z_][\w]*)")
+TEMPLATE_PARAM = re.compile(r"\{([^{}]+)\}")
+
+RESPONSE_CODE = re.compile(r"^([1-5][0-9]{2}|[1-5]XX|default)$")
+
+
+# Operation extension naming the source file an operation was extracted from
+SOURCE_FILE_KEY = "x-source-file"
+
+SECURITY_SCHEMES = {"bearerAuth": {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}}
+
+
+def build_openapi_spec(api_routes, title="API Documentation", version="1.0.0"):
+    """
+    Assemble an OpenAPI 3 document from {file_path: {"endpoints": [...]}}
+
+    One pass over the endpoints; each is normalised into an operation whatever
+    shape the extractor or model produced. When two files declare the same
+    method and path, the first file in path order wins. Every operation records
+    its source file under `x-source-file` so the spec can later be patched.
+    """
+    spec = {
+        "openapi": OPENAPI_VERSION,
+        "info": {
+            "title": title,
+            "version": version,
+            "description": "Automatically generated API documentation"
+        },
+        "paths": {}
+    }
+    operation_ids = set()
+    for file_path in sorted(api_routes):
+        add_file_operations(spec, file_path, api_routes[file_path], operation_ids)
+    return spec
+
+
+def patch_openapi_spec(spec, api_routes, files):
+    """
+    Update a spec built by build_openapi_spec in place for a set of changed files
+
+    The result has the same paths, operations and order as a full build of
+    `api_routes`, but operations of files outside `files` are taken over from
+    the existing spec unchanged (keeping e.g. enriched descriptions), so a
+    patch only touches what the changed files affect. Operations of a removed
+    or changed file that hid another file's duplicate method and path are
+    replaced by that file's operation, as a full build would. Returns the list
+    of (path, method) operations that were not taken over.
+
+    Assembly is still O(all files): operations are rebuilt from every stored
+    result and compared, since path order, duplicate resolution and operationIds
+    all depend on the whole set. It is a local, in-memory pass; what a patch
+    saves is the model and Gemini work on unchanged files.
+    """
+    files = set(files)
+    full = build_openapi_spec(api_routes)
+
+    old_operations = {(path, method): operation
+                      for path, path_item in spec["paths"].items() if isinstance(path_item, dict)
+                      for method, operation in path_item.items() if method in HTTP_METHODS}
+    def kept(path, method, operation):
+        """The old operation at this place, if its file did not change and still owns it"""
+        old = old_operations.get((path, method))
+        owner = operation[SOURCE_FILE_KEY]
+        if old is not None and owner not in files and old.get(SOURCE_FILE_KEY) == owner:
+            return old
+        return None
+
+    taken = {kept(path, method, operation).get("operationId")
+                for path, path_item in full["paths"].items() for method, operation in path_item.items()
+                if kept(path, method, operation) is not None}
+
+    paths, added = {}, []
+    for path, full_item in full["paths"].items():
+        old_item = spec["paths"].get(path)
+        # Non-operation entries (e.g. shared parameters) of a path stay as they were
+        path_item = {key: value for key, value in (old_item if isinstance(old_item, dict) else {}).items()
+                     if key not in HTTP_METHODS}
+        for method, operation in full_item.items():
+            old = kept(path, method, operation)
+            if old is not None:
+                path_item[method] = old
+                continue
+            if operation["operationId"] in taken:
+                # Already used by an operation taken over from the old spec
+                operation["operationId"] = unique_operation_id(method, path, taken | {
+                    other["operationId"] for item in full["paths"].values() for other in item.values()})
+            taken.add(operation["operationId"])
+            old = old_operations.get((path, method))
+            if old == operation:
+                path_item[method] = old
+            else:
+                path_item[method] = operation
+                added.append((path, method))
+        paths[path] = path_item
+
+    # Replace the contents rather than the dict, so the spec object stays the same
+    spec["paths"].clear()
+    spec["paths"].update(paths)
+
+    uses_auth = any("security" in operation for path_item in spec["paths"].values()
+                    for method, operation in path_item.items() if method in HTTP_METHODS)
+    components = spec.get("components", {})
+    if uses_auth and "bearerAuth" not in components.get("securitySchemes", {}):
+        spec.setdefault("components", {}).setdefault("securitySchemes", {}).update(SECURITY_SCHEMES)
+    elif not uses_auth and components == {"securitySchemes": SECURITY_SCHEMES}:
+        del spec["components"]
+    return added
+
+
+def is_patchable_spec(spec):
+    """Whether every operation of a loaded spec records its source file"""
+    if not isinstance(spec, dict) or not isinstance(spec.get("paths"), dict):
+        return False
+    return all(isinstance(operation, dict) and SOURCE_FILE_KEY in operation
+               for path_item in spec["paths"].values() if isinstance(path_item, dict)
+               for method, operation in path_item.items() if method in HTTP_METHODS)
+
+
+def add_file_operations(spec, file_path, result, operation_ids):
+    """Add the operations of one file's result to the spec; returns the (path, method) pairs added"""
+    added = []
+    endpoints = result.get("endpoints") if isinstance(result, dict) else None
+    for endpoint in endpoints if isinstance(endpoints, list) else []:
+        operation = build_operation(endpoint, file_path, operation_ids)
+        if operation is None:
+            continue
+        path, method, operation = operation
+        path_item = spec["paths"].setdefault(path, {})
+        if method in path_item:
+            operation_ids.discard(operation["operationId"])
+            continue
+        path_item[method] = operation
+        added.append((path, method))
+        if "security" in operation:
+            spec.setdefault("components", {}).setdefault("securitySchemes", {}).update(SECURITY_SCHEMES)
+    return added
+
+
+def build_operation(endpoint, file_path, operation_ids):
+    """Convert one endpoint dict into (path, method, operation), or None when it has no usable path or method"""
+    if not isinstance(endpoint, dict):
+        return None
+    path = normalize_path(endpoint.get("path"))
+    method = str(endpoint.get("method") or "").strip().lower()
+    if path is None or method not in HTTP_METHODS:
+        return None
+
+    description = str(endpoint.get("description") or "").strip()
+    operation = {
+        "summary": summarize(description) or f"{method.upper()} {path}",
+        "operationId": unique_operation_id(method, path, operation_ids),
+    }
+    if description and description != operation["summary"]:
+        operation["description"] = description
+    tags = endpoint.get("tags")
+    if isinstance(tags, list) and tags:
+        operation["tags"] = [str(tag) for tag in tags]
+
+    parameters, body_fields = split_parameters(endpoint.get("parameters"), path, method)
+    if parameters:
+        operation["parameters"] = parameters
+    request_body = build_request_body(endpoint.get("requestBody") or endpoint.get("request_body"), body_fields)
+    if request_body:
+        operation["requestBody"] = request_body
+
+    operation["responses"] = build_responses(endpoint.get("response") or endpoint.get("responses"))
+    if endpoint.get("authentication") not in (None, False, "", "none", "None", [], {}):
+        operation["security"] = [{"bearerAuth": []}]
+    operation[SOURCE_FILE_KEY] = file_path
+    return path, method, operation
+
+
+def normalize_path(path):
+    if not isinstance(path, str) or not path.strip():
+        return None
+    path = path.strip().split("?")[0]
+    path = FLASK_PARAM.sub(r"{\1}", path)
+    path = COLON_PARAM.sub(r"{\1}", path)
+    path = "/" + path.lstrip("/")
+    path = re.sub(r"/{2,}", "/", path)
+    if len(path) > 1:
+        path = path.rstrip("/")
+    return path
+
+
+def summarize(description):
+    first_line = description.split("\n")[0].strip()
+    return first_line if len(first_line) <= 120 else first_line[:117] + "..."
+
+
+def unique_operation_id(method, path, operation_ids):
+    base = method + "_" + ("_".join(re.findall(r"[A-Za-z0-9]+", path)) or "root")
+    operation_id, suffix = base, 2
+    while operation_id in operation_ids:
+        operation_id, suffix = f"{base}_{suffix}", suffix + 1
+    operation_ids.add(operation_id)
+    return operation_id
+
+
+def schema_for(value):
+    """OpenAPI schema for a type name, a {"type": ...} schema or a {field: type} mapping"""
+    if isinstance(value, dict):
+        if isinstance(value.get("type"), str) and value["type"].lower() in ("object", "array", "string", "integer",
+                                                                           "number", "boolean"):
+            schema = {"type": value["type"].lower()}
+            if isinstance(value.get("properties"), dict):
+                schema["properties"] = {str(name): schema_for(field) for name, field in value["properties"].items()}
+            if schema["type"] == "array":
+                schema["items"] = schema_for(value.get("items")) if value.get("items") else {}
+            for key in ("format", "enum", "description"):
+                if key in value:
+                    schema[key] = value[key]
+            return schema
+        return {"type": "object", "properties": {str(name): schema_for(field) for name, field in value.items()}}
+    if isinstance(value, list):
+        return {"type": "array", "items": schema_for(value[0]) if value else {}}
+    if isinstance(value, str):
+        name = value.strip()
+        list_match = re.match(r"^(?:list|List|array|Array|Sequence)\[(.+)\]$|^(.+)\[\]$", name)
+        if list_match:
+            return {"type": "array", "items": schema_for(list_match.group(1) or list_match.group(2))}
+        optional = re.match(r"^Optional\[(.+)\]$", name)
+        if optional:
+            return schema_for(optional.group(1))
+        return dict(TYPE_SCHEMAS.get(name.lower(), {"type": "string"}))
+    return {"type": "string"}
+
+
+def split_parameters(raw_parameters, path, method):
+    """
+    Split extracted parameters into OpenAPI parameters and request body fields
+
+    Every {name} in the path template gets a required path parameter, declared
+    or not, since validators reject templates without one.
+    """
+    path_names = TEMPLATE_PARAM.findall(path)
+    parameters, body_fields, seen = [], {}, set()
+
+    for raw in raw_parameters if isinstance(raw_parameters, list) else []:
+        if isinstance(raw, str):
+            raw = {"name": raw}
+        if not isinstance(raw, dict) or not raw.get("name"):
+            continue
+        name = str(raw["name"])
+        location = str(raw.get("in") or raw.get("location") or "").lower().replace(" ", "")
+        if name in path_names:
+            location = "path"
+        elif location in BODY_LOCATIONS or (not location and method in ("post", "put", "patch")):
+            body_fields[name] = raw
+            continue
+        elif location not in PARAMETER_LOCATIONS or location == "path":
+            location = "query"
+        if (name, location) in seen:
+            continue
+        seen.add((name, location))
+
+        parameter = {"name": name, "in": location}
+        if raw.get("description"):
+            parameter["description"] = str(raw["description"])
+        parameter["required"] = True if location == "path" else bool(raw.get("required", False))
+        parameter["schema"] = schema_for(raw.get("schema") or raw.get("type") or "string")
+        parameters.append(parameter)
+
+    for name in path_names:
+        if (name, "path") not in seen:
+            seen.add((name, "path"))
+            parameters.append({"name": name, "in": "path", "required": True, "schema": {"type": "string"}})
+    return parameters, body_fields
+
+
+def build_request_body(raw_body, body_fields):
+    if body_fields:
+        properties, required = {}, []
+        for name, raw in body_fields.items():
+            properties[name] = schema_for(raw.get("schema") or raw.get("type") or "string")
+            if raw.get("required"):
+                required.append(name)
+        # A single body parameter that is itself a model is the whole body
+        only = next(iter(body_fields.values())) if len(body_fields) == 1 else None
+        if only is not None and isinstance(only.get("schema"), dict):
+            schema = properties[str(only["name"])]
+        elif only is not None and str(only.get("type", "")).lower() not in TYPE_SCHEMAS:
+            schema = {"type": "object", "title": str(only["type"])} if only.get("type") else {"type": "object"}
+        else:
+            schema = {"type": "object", "properties": properties}
+            if required:
+                schema["required"] = required
+        media_type = "multipart/form-data" if any(str(raw.get("in", "")).lower() in ("form", "formdata", "file")
+                                                   for raw in body_fields.values()) else "application/json"
+        return {"required": bool(required) or len(body_fields) == 1, "content": {media_type: {"schema": schema}}}
+
+    if isinstance(raw_body, dict) and raw_body:
+        content = raw_body.get("content")
+        if isinstance(content, dict) and content:
+            return {"required": bool(raw_body.get("required", True)),
+                    "content": {str(media): {"schema": schema_for((value or {}).get("schema", "object"))}
+                                for media, value in content.items()}}
+        return {"required": True, "content": {"application/json": {"schema": schema_for(raw_body.get("schema", raw_body))}}}
+    return None
+
+
+def build_responses(raw_responses):
+    responses = {}
+    if isinstance(raw_responses, dict):
+        for code, value in raw_responses.items():
+            code = str(code)
+            if not RESPONSE_CODE.match(code):
+                continue
+            response = {"description": "Successful response" if code.startswith("2") else "Response"}
+            if isinstance(value, dict):
+                if value.get("description"):
+                    response["description"] = str(value["description"])
+                if value.get("schema"):
+                    response["content"] = {"application/json": {"schema": schema_for(value["schema"])}}
+            elif isinstance(value, str) and value.strip():
+                response["description"] = value.strip()
+            responses[code] = response
+
+        if not responses and raw_responses:
+            # A bare body structure instead of a code-to-response mapping
+            responses["200"] = {"description": "Successful response",
+                                "content": {"application/json": {"schema": schema_for(raw_responses)}}}
+    elif isinstance(raw_responses, str) and raw_responses.strip():
+        responses["200"] = {"description": raw_responses.strip()}
+
+    return responses or {"200": {"description": "Successful response"}}
+
+
+def validate_openapi_spec(spec):
+    """Check the structural rules of OpenAPI 3.0 this assembler has to uphold; returns a list of problems"""
+    problems = []
+    if not str(spec.get("openapi", "")).startswith("3."):
+        problems.append("openapi version must be 3.x")
+    info = spec.get("info") or {}
+    if not info.get("title") or not info.get("version"):
+        problems.append("info.title and info.version are required")
+
+    operation_ids = set()
+    schemes = (spec.get("components") or {}).get("securitySchemes") or {}
+    for path, path_item in (spec.get("paths") or {}).items():
+        if not path.startswith("/"):
+            problems.append(f"{path}: path must start with /")
+        template_names = set(TEMPLATE_PARAM.findall(path))
+        for method, operation in path_item.items():
+            where = f"{method.upper()} {path}"
+            if method not in HTTP_METHODS:
+                problems.append(f"{where}: unknown method")
+                continue
+            if not operation.get("responses"):
+                problems.append(f"{where}: responses are required")
+            for code, response in (operation.get("responses") or {}).items():
+                if not RESPONSE_CODE.match(str(code)) or "description" not in response:
+                    problems.append(f"{where}: invalid response {code}")
+
+            operation_id = operation.get("operationId")
+            if operation_id in operation_ids:
+                problems.append(f"{where}: duplicate operationId {operation_id}")
+            operation_ids.add(operation_id)
+
+            seen, declared_path_names = set(), set()
+            for parameter in operation.get("parameters", []):
+                key = (parameter.get("name"), parameter.get("in"))
+                if key in seen:
+                    problems.append(f"{where}: duplicate parameter {key[0]} in {key[1]}")
+                seen.add(key)
+                if parameter.get("in") not in PARAMETER_LOCATIONS:
+                    problems.append(f"{where}: parameter {key[0]} has invalid location {key[1]}")
+                if parameter.get("in") == "path":
+                    declared_path_names.add(parameter.get("name"))
+                    if parameter.get("required") is not True:
+                        problems.append(f"{where}: path parameter {key[0]} must be required")
+            if template_names != declared_path_names:
+                problems.append(f"{where}: path parameters do not match the path template")
+
+            for requirement in operation.get("security", []):
+                for scheme in requirement:
+                    if scheme not in schemes:
+                        problems.append(f"{where}: undefined security scheme {scheme}")
+    return problems
+
+
+def dump_openapi_yaml(spec):
+    return yaml.safe_dump(spec, sort_keys=False, allow_unicode=True)
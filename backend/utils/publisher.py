@@ -0,0 +1,107 @@
+import hashlib
+
+import httpx
+
+from utils.repo import GITHUB_API_URL, SSL_CONTEXT
+from utils.github_client import github_request
+
+
+class PublishError(Exception):
+    """Raised when the generated files could not be committed to the docs branch"""
+
+
+def github_headers(token):
+    return {
+        "Accept": "application/vnd.github+json",
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+
+
+def check_response(response, action):
+    if response.status_code not in (200, 201):
+        raise PublishError(f"Failed to {action}: {response.status_code} {response.text}")
+    return response.json()
+
+
+def git_blob_sha(content):
+    """SHA git gives a file with this content, as listed in trees and the contents API"""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+async def resolve_refs(client, owner, repo, branch):
+    """
+    Find the head commit of the docs branch, or of the default branch to start it from
+
+    All branch heads come back from one matching-refs request.
+    Returns (parent_sha, branch_exists).
+    """
+    response = await github_request(client, "GET", f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/matching-refs/heads/")
+    heads = {ref["ref"][len("refs/heads/"):]: ref["object"]["sha"] for ref in check_response(response, "get refs")}
+    if branch in heads:
+        return heads[branch], True
+    default_sha = heads.get("main") or heads.get("master")
+    if not default_sha:
+        raise PublishError("Could not find default branch")
+    return default_sha, False
+
+
+async def publish_files(owner, repo, token, files, branch="doccie", message=None):
+    """
+    Commit several files to a branch at once using the Git Data API
+
+    The branch is created from main/master if it does not exist yet. Files whose
+    git blob SHA matches the one already on the branch are left out, and when
+    none changed no commit is made. Whatever the number of files, a run costs
+    five requests: one to resolve refs, one for the parent commit's tree, then
+    one each to create the tree, create the commit and move the branch. The ref
+    update is not forced, so a concurrent push to the branch makes it fail
+    rather than being overwritten.
+
+    :param files: Dictionary of repository-relative paths to text contents
+    :return: Dictionary with the new commit SHA (None if nothing changed) and
+             the uploaded and skipped paths
+    """
+    async with httpx.AsyncClient(verify=SSL_CONTEXT, headers=github_headers(token), timeout=30.0) as client:
+        base_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/git"
+        parent_sha, branch_exists = await resolve_refs(client, owner, repo, branch)
+
+        # Trees can be read by commit SHA; nested paths need the whole tree to compare against
+        params = {"recursive": "1"} if any("/" in path for path in files) else {}
+        parent_tree = check_response(await github_request(client, "GET", f"{base_url}/trees/{parent_sha}", params=params),
+                                     "get parent tree")
+        existing = {entry["path"]: entry["sha"] for entry in parent_tree["tree"] if entry["type"] == "blob"}
+
+        changed = {path: content for path, content in files.items()
+                   if not branch_exists or existing.get(path) != git_blob_sha(content)}
+        result = {"commit": None, "uploaded": sorted(changed), "skipped": sorted(set(files) - set(changed))}
+        if not changed:
+            print(f"All {len(files)} files are unchanged on {branch} branch, nothing to commit")
+            return result
+
+        tree = check_response(await github_request(client, "POST", f"{base_url}/trees", json={
+            "base_tree": parent_tree["sha"],
+            "tree": [{"path": path, "mode": "100644", "type": "blob", "content": content}
+                     for path, content in changed.items()],
+        }), "create tree")
+
+        commit = check_response(await github_request(client, "POST", f"{base_url}/commits", json={
+            "message": message or f"Update {', '.join(sorted(changed))}",
+            "tree": tree["sha"],
+            "parents": [parent_sha],
+        }), "create commit")
+
+        if branch_exists:
+            response = await github_request(client, "PATCH", f"{base_url}/refs/heads/{branch}",
+                                            json={"sha": commit["sha"], "force": False})
+            check_response(response, "update branch")
+        else:
+            response = await github_request(client, "POST", f"{base_url}/refs",
+                                            json={"ref": f"refs/heads/{branch}", "sha": commit["sha"]})
+            check_response(response, "create branch")
+
+    print(f"Committed {len(changed)} files to {branch} branch as {commit['sha'][:7]}, "
+          f"{len(result['skipped'])} unchanged")
+    result["commit"] = commit["sha"]
+    return result
@@ -1,169 +1,172 @@
 import os
 import re
-import requests
+import asyncio
+import httpx
 import tempfile
 import zipfile
-import shutil
-import json
-from urllib.parse import urlparse
+from urllib.parse import quote
 
-def get_github_repo_contents(owner, repo, token, branch="main", output_file=None):
-    """
-    Download and extract a GitHub repository with improved error handling and validation
-    
-    :param owner: GitHub repository owner
-    :param repo: Repository name
-    :param token: GitHub Personal Access Token
-    :param branch: Repository branch (default is 'main')
-    :param output_file: Optional path to save repository contents as JSON
-    :return: Dictionary of repository contents with file paths and contents
+from utils.github_client import github_request, github_send
+
+IGNORE_PATTERNS = [
+    r"^(node_modules|bower_components|jspm_packages|vendor|dist|build|out|target)",
+    r"^(\.(git|svn|hg)|__pycache__|\.vscode|\.idea|\.eclipse)",
+    r"(\.pyc|\.pyo|\.pyd|\.class|\.log|\.sqlite3)$",
+    r"\.(gif|jpg|jpeg|png|bmp|webp|mp4|avi|mov|mp3|wav|zip|tar|gz|7z|ipynb)$",
+    r"package-lock.json",
+]
+
+IGNORE_REGEX = re.compile("|".join(IGNORE_PATTERNS), re.IGNORECASE)
+
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+
+# Size of the reads used while downloading a zipball
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("REPO_DOWNLOAD_CHUNK_SIZE", 1024 * 1024))
+
+# Building an SSL context is slow and blocking, so it is done once at import time
+SSL_CONTEXT = httpx.create_ssl_context()
+
+# Maximum number of concurrent single-file downloads during incremental runs
+FILE_FETCH_CONCURRENCY = int(os.getenv("GITHUB_FETCH_CONCURRENCY", 8))
+
+# Archives smaller than this stay in memory while streaming; larger ones spill to a temp file
+SPOOL_MAX_SIZE = int(os.getenv("REPO_SPOOL_MAX_BYTES", 256 * 1024 * 1024))
+
+async def download_github_archive(owner, repo, token, branch="main", chunk_size=DOWNLOAD_CHUNK_SIZE):
     """
-    temp_dir = None
-    try:
-        # Validate token format
-        # if not token.startswith(('ghp_', 'gho_', 'github_pat_')):
-        #     raise ValueError("Invalid GitHub token format")
-
-        # Create a temporary directory
-        temp_dir = tempfile.mkdtemp(prefix='doccie_')
-        os.chmod(temp_dir, 0o755)
-
-        # Create temporary file for ZIP download
-        temp_zip = os.path.join(temp_dir, "repo.zip")
-        
-        # GitHub API headers
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {token}",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
+    Stream a repository zipball into a spooled temporary file without blocking the event loop
 
+    The caller owns (and must close) the returned file. Raises on access or network errors.
+    """
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+
+    # Zipball requests redirect to codeload.github.com
+    async with httpx.AsyncClient(verify=SSL_CONTEXT, follow_redirects=True,
+                                 timeout=httpx.Timeout(30.0, read=300.0)) as client:
         # First verify repository access
-        verify_url = f"https://api.github.com/repos/{owner}/{repo}"
-        verify_response = requests.get(verify_url, headers=headers)
+        verify_response = await github_request(client, "GET", f"{GITHUB_API_URL}/repos/{owner}/{repo}", headers=headers)
         if verify_response.status_code != 200:
             raise Exception(f"Repository access failed: {verify_response.json().get('message', 'Unknown error')}")
 
-        # Download URL for the repository
-        download_url = f"https://api.github.com/repos/{owner}/{repo}/zipball/{branch}"
-        
-        # Download the repository
+        download_url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/zipball/{branch}"
+
         print(f"Downloading repository {owner}/{repo}...")
-        with requests.get(download_url, headers=headers, stream=True) as response:
-            response.raise_for_status()
-            with open(temp_zip, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-        
-        # Verify the downloaded file is a valid ZIP
-        if not zipfile.is_zipfile(temp_zip):
-            raise Exception("Downloaded file is not a valid ZIP file")
-
-        # Create extraction directory
-        extract_dir = os.path.join(temp_dir, "extracted")
-        os.makedirs(extract_dir, exist_ok=True)
-
-        # Extract the repository
-        print("Extracting repository contents...")
-        with zipfile.ZipFile(temp_zip, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
-
-        # Get the extracted directory name (GitHub adds a unique prefix)
-        extracted_dirs = [d for d in os.listdir(extract_dir) 
-                        if os.path.isdir(os.path.join(extract_dir, d))]
-        if not extracted_dirs:
-            raise Exception("No directory found after extraction")
-
-        repo_path = os.path.join(extract_dir, extracted_dirs[0])
-        
-        # Parse repository contents
-        print("Parsing repository files...")
-        repo_contents = parse_directory(repo_path)
-
-        # Save to JSON if requested
-        if output_file and repo_contents:
-            save_to_json(repo_contents, output_file)
-
-        return repo_contents
-
-    except requests.exceptions.RequestException as e:
-        print(f"Network error: {str(e)}")
-        return {}
-    except zipfile.BadZipFile:
-        print("Error: Invalid or corrupted ZIP file")
-        return {}
-    except Exception as e:
-        print(f"Error processing repository: {str(e)}")
-        return {}
-    finally:
-        # Clean up temporary directory
-        if temp_dir and os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
-
-
-def parse_directory(directory):
+        archive_file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        try:
+            response = await github_send(client, client.build_request("GET", download_url, headers=headers), stream=True)
+            try:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(chunk_size):
+                    # Writes may hit the disk once the spool rolls over
+                    await asyncio.to_thread(archive_file.write, chunk)
+            finally:
+                await response.aclose()
+        except BaseException:
+            archive_file.close()
+            raise
+
+        return archive_file
+
+
+async def fetch_github_files(owner, repo, token, paths, ref, extensions=None):
     """
-    Recursively parse directory contents with improved binary file handling
+    Fetch a selected set of files at a given ref without downloading the whole repository
+
+    Ignored paths and unwanted extensions are skipped before any request is made.
+    Files that do not exist at the ref (e.g. deleted later in the same push) are
+    left out of the result.
+
+    :param owner: GitHub repository owner
+    :param repo: Repository name
+    :param token: GitHub Personal Access Token
+    :param paths: Iterable of repository-relative file paths
+    :param ref: Commit SHA or branch to read the files at
+    :param extensions: Optional set of file extensions to keep
+    :return: Dictionary of repository contents with file paths and contents
     """
-    IGNORE_PATTERNS = [
-        r"^(node_modules|bower_components|jspm_packages|vendor|dist|build|out|target)",
-        r"^(\.(git|svn|hg)|__pycache__|\.vscode|\.idea|\.eclipse)",
-        r"(\.pyc|\.pyo|\.pyd|\.class|\.log|\.sqlite3)$",
-        r"\.(gif|jpg|jpeg|png|bmp|webp|mp4|avi|mov|mp3|wav|zip|tar|gz|7z|ipynb)$",
-        r"package-lock.json",
+    headers = {
+        "Accept": "application/vnd.github.raw+json",
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28"
+    }
+    semaphore = asyncio.Semaphore(FILE_FETCH_CONCURRENCY)
+
+    wanted = [
+        path for path in paths
+        if not is_ignored_path(path)
+        and (extensions is None or os.path.splitext(path)[1].lower() in extensions)
     ]
 
-    ignore_regex = re.compile("|".join(IGNORE_PATTERNS), re.IGNORECASE)
-    contents = {}
+    async def fetch_file(client, path):
+        async with semaphore:
+            response = await github_request(
+                client,
+                "GET",
+                f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{quote(path)}",
+                headers=headers,
+                params={"ref": ref},
+            )
+        if response.status_code == 404:
+            return path, None
+        response.raise_for_status()
+
+        try:
+            content = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            content = "[Binary File]"
+        return path, {"path": path, "content": content, "size": len(response.content)}
+
+    async with httpx.AsyncClient(verify=SSL_CONTEXT, follow_redirects=True, timeout=30.0) as client:
+        results = await asyncio.gather(*(fetch_file(client, path) for path in wanted))
+
+    return {path: file_info for path, file_info in results if file_info is not None}
+
+
+def iter_archive_file(archive_file, extensions=None):
+    """Validate a downloaded zipball and yield its members one by one as they are decompressed"""
+    if not zipfile.is_zipfile(archive_file):
+        raise Exception("Downloaded file is not a valid ZIP file")
+    yield from iter_zip_archive(archive_file, extensions)
+
+
+def is_ignored_path(relative_path):
+    """Check a '/'-separated archive path and each of its directories against the ignore patterns"""
+    if IGNORE_REGEX.search(relative_path):
+        return True
+    return any(IGNORE_REGEX.search(part) for part in relative_path.split("/")[:-1])
+
+
+def iter_zip_archive(zip_source, extensions=None):
+    """Yield (relative_path, file_info) for the kept members of a ZIP archive, one at a time"""
+    with zipfile.ZipFile(zip_source) as archive:
+        for member in archive.infolist():
+            if member.is_dir():
+                continue
 
-    for root, dirs, files in os.walk(directory):
-        # Filter directories
-        dirs[:] = [d for d in dirs if not ignore_regex.search(d)]
+            # GitHub zipballs wrap everything in a single "<owner>-<repo>-<sha>/" directory
+            _, _, relative_path = member.filename.partition("/")
+            if not relative_path or is_ignored_path(relative_path):
+                continue
 
-        for file in files:
-            relative_path = os.path.relpath(os.path.join(root, file), directory)
-            
-            # Skip ignored files
-            if ignore_regex.search(relative_path):
+            if extensions is not None and os.path.splitext(relative_path)[1].lower() not in extensions:
                 continue
 
-            full_path = os.path.join(root, file)
             try:
-                file_size = os.path.getsize(full_path)
-                
-                # Try to detect if file is binary
-                is_binary = False
+                data = archive.read(member)
                 try:
-                    with open(full_path, 'tr') as check_file:
-                        check_file.read(1024)
+                    content = data.decode("utf-8")
                 except UnicodeDecodeError:
-                    is_binary = True
-
-                if is_binary:
-                    contents[relative_path] = {
-                        "path": relative_path,
-                        "content": "[Binary File]",
-                        "size": file_size,
-                    }
-                else:
-                    with open(full_path, 'r', encoding='utf-8') as f:
-                        contents[relative_path] = {
-                            "path": relative_path,
-                            "content": f.read(),
-                            "size": file_size,
-                        }
-
+                    content = "[Binary File]"
             except Exception as e:
                 print(f"Error reading file {relative_path}: {str(e)}")
+                continue
 
-    return contents
-
-
-def save_to_json(contents, output_file):
-    """Save repository contents to JSON with error handling"""
-    try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(contents, f, indent=2, ensure_ascii=False)
-        print(f"Repository contents saved to {output_file}")
-    except Exception as e:
-        print(f"Error saving to JSON: {str(e)}")
\ No newline at end of file
+            yield relative_path, {
+                "path": relative_path,
+                "content": content,
+                "size": member.file_size,
+            }
@@ -0,0 +1,91 @@
+import collections
+import os
+
+from utils.github_client import github_get
+
+# Number of repository trees (one per head commit) kept in memory
+TREE_CACHE_SIZE = int(os.getenv("REPO_TREE_CACHE_SIZE", 64))
+
+# Trees of commits by (repository full name, commit SHA); a commit's tree never changes
+tree_cache = collections.OrderedDict()
+
+
+def index_tree(entries):
+    """Group the flat entries of a recursive Git Trees response by parent directory"""
+    children = collections.defaultdict(list)
+    for entry in entries:
+        if entry["type"] not in ("blob", "tree"):
+            # Submodules (commits) have no content in this repository
+            continue
+        parent, _, name = entry["path"].rpartition("/")
+        children[parent].append({
+            "name": name,
+            "path": entry["path"],
+            "type": "directory" if entry["type"] == "tree" else "file",
+        })
+    for items in children.values():
+        # Directories first, then files, each alphabetically
+        items.sort(key=lambda item: (item["type"] != "directory", item["name"].lower()))
+    return dict(children)
+
+
+def subtree(index, path="", depth=1, offset=0, limit=None):
+    """
+    Items of a directory, with subdirectories expanded `depth - 1` levels further
+
+    Directories that are not expanded have "children": None and say whether
+    they have any, so the client can fetch them on demand. `offset` and `limit`
+    page through the items of `path` itself.
+    """
+    items = index.get(path, [])
+    items = items[offset:offset + limit] if limit is not None else items[offset:]
+    result = []
+    for item in items:
+        item = dict(item)
+        if item["type"] == "directory":
+            item["has_children"] = bool(index.get(item["path"]))
+            item["children"] = subtree(index, item["path"], depth - 1) if depth > 1 else None
+        result.append(item)
+    return result
+
+
+async def load_repository_tree(client, full_name, branch, token):
+    """
+    Tree of a branch's head commit, fetched with one recursive Git Trees request
+
+    The head SHA is looked up on every call (a conditional request, free while
+    the branch has not moved); the tree itself is cached by that SHA.
+    Returns (sha, index, truncated), with index as built by index_tree.
+    """
+    response = await github_get(
+        client,
+        f"https://api.github.com/repos/{full_name}/commits/{branch}",
+        token,
+        headers={"Accept": "application/vnd.github.sha"},
+        endpoint="/repos/{repo}/commits/{branch}",
+    )
+    if response.status_code == 409:
+        # Empty repository: no commits, no tree
+        return None, {}, False
+    response.raise_for_status()
+    sha = response.text.strip()
+
+    key = (full_name, sha)
+    if key in tree_cache:
+        tree_cache.move_to_end(key)
+        return (sha, *tree_cache[key])
+
+    response = await github_get(
+        client,
+        f"https://api.github.com/repos/{full_name}/git/trees/{sha}",
+        token,
+        params={"recursive": "1"},
+        endpoint="/repos/{repo}/git/trees",
+    )
+    response.raise_for_status()
+    tree = response.json()
+
+    tree_cache[key] = (index_tree(tree["tree"]), tree.get("truncated", False))
+    while len(tree_cache) > TREE_CACHE_SIZE:
+        tree_cache.popitem(last=False)
+    return (sha, *tree_cache[key])
@@ -0,0 +1,72 @@
+import os
+import re
+
+# Per-language patterns of the ways common web frameworks register routes.
+# A file matching none of its language's patterns has no endpoints to document.
+ROUTE_SIGNATURES = {
+    ".py": [
+        r"@[\w.]+\.(route|get|post|put|delete|patch|api_route|websocket)\s*\(",   # Flask, FastAPI, aiohttp, Sanic
+        r"\.(add_url_rule|add_api_route|add_route|add_routes|add_get|add_post|add_put|add_patch|add_delete|add_view|add_resource)\s*\(",
+        r"\brouter\.register\s*\(|\b(Route|Mount|WebSocketRoute)\s*\(\s*['\"]",                # DRF routers, Starlette
+        r"\burlpatterns\b|@api_view\b|\b(APIView|ViewSet|ModelViewSet|GenericAPIView|View)\b",  # Django / DRF
+        r"\bRequestHandler\b|\bweb\.(get|post|put|delete|route)\s*\(",             # tornado, aiohttp
+    ],
+    ".js": [
+        r"\b\w+\s*\.\s*(get|post|put|delete|patch|all|options|head|route)\s*\(\s*['\"`/]",  # Express, Koa, Fastify
+        # Paths held in variables: any argument counts once a router is created or on a conventional router name
+        r"\bexpress\s*\(\s*\)|\bexpress\s*\.\s*Router\s*\(|\bnew\s+(Koa)?Router\s*\(|\b(fastify|Fastify)\s*\(|\bnew\s+Hono\s*\(",
+        r"\b(app|router|api|server|routes|\w+Router)\s*\.\s*(get|post|put|delete|patch|all|route)\s*\(",
+        r"\bfastify\s*\.\s*route\s*\(|\bserver\s*\.\s*route\s*\(",                          # Fastify, Hapi
+        r"@(Get|Post|Put|Delete|Patch|All|Controller)\s*\(",                                   # NestJS
+        r"export\s+(default\s+)?(async\s+)?function\s+(handler|GET|POST|PUT|DELETE|PATCH)\b",  # Next.js API routes
+        r"\bcreateServer\s*\(|\breq\.(method|url)\b",                                          # plain http module
+    ],
+    ".java": [
+        r"@(Get|Post|Put|Delete|Patch|Request)Mapping\b",                         # Spring
+        r"@(Path|GET|POST|PUT|DELETE|PATCH)\b",                                   # JAX-RS
+        r"@(RestController|Controller)\b|\bextends\s+HttpServlet\b|@WebServlet\b",
+    ],
+    ".go": [
+        r"\bHandleFunc\s*\(|\bHandle\s*\(",                                       # net/http, gorilla/mux
+        r"\.(GET|POST|PUT|DELETE|PATCH|Any|Group)\s*\(",                            # Gin, Echo, whatever the path argument
+        r"\.(Get|Post|Put|Delete|Patch|Route|Mount)\s*\(\s*\"",                   # chi, Fiber
+        r"\b(gin\.(Default|New)|echo\.New|mux\.NewRouter|chi\.NewRouter|fiber\.New|http\.NewServeMux)\s*\(",
+    ],
+    ".rb": [
+        r"^\s*(get|post|put|patch|delete|match|resources?|namespace|scope|root)\s+['\":/]",  # Rails routes, Sinatra
+        r"\broutes\.draw\b|<\s*(ApplicationController|ActionController::\w+|Sinatra::Base|Grape::API)\b",
+    ],
+    ".php": [
+        r"\bRoute::(get|post|put|patch|delete|any|match|resource|apiResource|group)\s*\(",  # Laravel
+        r"\$(app|router|r)\s*->\s*(get|post|put|patch|delete|map|any|group)\s*\(",        # Slim, Lumen
+        r"#\[Route\s*\(|@Route\s*\(|\$_(GET|POST|REQUEST|SERVER)\b",                      # Symfony, plain PHP
+    ],
+    ".rs": [
+        r"#\[(get|post|put|delete|patch|route)\s*\(",                             # actix-web, Rocket
+        r"\.route\s*\(|\bRouter::new\s*\(|\bweb::(get|post|put|delete|resource|scope)\b",  # axum, actix-web
+        r"\bwarp::(path|get|post)\b",
+    ],
+    ".cs": [
+        r"\[(Http(Get|Post|Put|Delete|Patch)|Route|ApiController)\b",             # ASP.NET controllers
+        r"\.Map(Get|Post|Put|Delete|Patch|Methods|Controllers)\s*\(",             # minimal APIs
+        r":\s*(Controller|ControllerBase)\b",
+    ],
+}
+
+COMPILED_SIGNATURES = {
+    extension: re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.MULTILINE)
+    for extension, patterns in ROUTE_SIGNATURES.items()
+}
+
+
+def has_route_signature(file_path, content):
+    """
+    Cheaply decide whether a source file may define API endpoints
+
+    Files in languages without known signatures are kept, so the filter can only
+    skip files it has positively ruled out.
+    """
+    signature = COMPILED_SIGNATURES.get(os.path.splitext(file_path)[1].lower())
+    if signature is None:
+        return True
+    return signature.search(content) is not None
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+
+class Superseded(Exception):
+    """Raised at a stage boundary of a generation run that a newer push has made obsolete"""
+
+
+def raise_if_superseded(request):
+    superseded = request.get("superseded")
+    if superseded is not None and superseded.is_set():
+        raise Superseded()
+
+
+def merge_changes(earlier, later):
+    """
+    Combine the {"changed", "removed"} sets of two consecutive pushes
+
+    None stands for "unknown, do a full run" and wins over any file list.
+    """
+    if earlier is None or later is None:
+        return None
+    changed = (set(earlier["changed"]) - set(later["removed"])) | set(later["changed"])
+    removed = (set(earlier["removed"]) - set(later["changed"])) | set(later["removed"])
+    return {"changed": sorted(changed), "removed": sorted(removed)}
+
+
+def merge_requests(earlier, later):
+    """The later request (newest head and token) covering the file changes of both"""
+    merged = dict(later)
+    merged["changes"] = merge_changes(earlier.get("changes"), later.get("changes"))
+    return merged
+
+
+class CoalescingScheduler:
+    """
+    Run generation requests in the background, one at a time per repository branch
+
+    A request arriving while a run for the same key is in flight becomes the
+    single pending "latest head" job, merged with any request already waiting.
+    The in-flight run is told it is superseded and stops at its next stage
+    boundary; its file changes are then folded into the pending job so nothing
+    it had not finished is lost.
+    """
+
+    def __init__(self, run):
+        self.run = run
+        self.running = {}
+        self.pending = {}
+        self.tasks = set()
+        self.counters = {"submitted": 0, "started": 0, "coalesced": 0, "superseded": 0, "completed": 0, "failed": 0}
+
+    def submit(self, key, request):
+        """Schedule a request without waiting for it; returns "started" or "coalesced\""""
+        self.counters["submitted"] += 1
+        if key not in self.running:
+            self.start(key, request)
+            return "started"
+
+        self.counters["coalesced"] += 1
+        waiting = self.pending.get(key)
+        self.pending[key] = merge_requests(waiting, request) if waiting else request
+        self.running[key]["request"]["superseded"].set()
+        return "coalesced"
+
+    def start(self, key, request):
+        request = {**request, "superseded": asyncio.Event()}
+        self.counters["started"] += 1
+        task = asyncio.ensure_future(self.execute(key, request))
+        self.running[key] = {"request": request, "task": task, "started": time.time()}
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def execute(self, key, request):
+        try:
+            result = await self.run(request)
+            self.counters["completed"] += 1
+            print(f"API documentation generation completed for {key}: {result}")
+        except Superseded:
+            self.counters["superseded"] += 1
+            print(f"Generation for {key} superseded by a newer push")
+            # The run stopped before storing its results: the next run has to cover its files too
+            self.pending[key] = merge_requests(request, self.pending[key])
+        except Exception as e:
+            self.counters["failed"] += 1
+            print(f"Generation for {key} failed: {e}")
+        finally:
+            del self.running[key]
+            following = self.pending.pop(key, None)
+            if following is not None:
+                following.pop("superseded", None)
+                self.start(key, following)
+
+    def stats(self):
+        now = time.time()
+        return {
+            "running": {"/".join(key): now - job["started"] for key, job in self.running.items()},
+            "pending": ["/".join(key) for key in self.pending],
+            **self.counters,
+        }
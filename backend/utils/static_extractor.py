@@ -0,0 +1,521 @@
+import ast
+import os
+import re
+
+from utils.route_signatures import has_route_signature
+
+# Decorator/method names that register a route for a single HTTP method
+HTTP_METHODS = {"get", "post", "put", "delete", "patch", "options", "head", "trace"}
+
+# Decorator/method names that register a route for a list of methods
+ROUTE_REGISTRARS = {"route", "api_route"}
+
+# Constructors whose result is a router/app object, with the keyword holding its path prefix
+ROUTER_FACTORIES = {
+    "FastAPI": None,
+    "APIRouter": "prefix",
+    "Flask": None,
+    "Blueprint": "url_prefix",
+    "RouteTableDef": None,
+}
+
+# Routers whose handler signatures describe query/body parameters
+SIGNATURE_ROUTERS = {"FastAPI", "APIRouter"}
+
+# Frameworks that register routes in ways this extractor does not understand
+UNSUPPORTED_FRAMEWORKS = {"tornado", "falcon", "pyramid", "cherrypy", "sanic", "bottle"}
+
+# Route registration calls of otherwise supported frameworks that this extractor does not resolve:
+# aiohttp's app.router.add_get()/app.add_routes(), DRF's router.register(), Flask-RESTful's add_resource()
+UNSUPPORTED_REGISTRARS = {
+    "add_get", "add_post", "add_put", "add_patch", "add_delete", "add_head", "add_route", "add_routes",
+    "add_view", "add_resource", "register",
+}
+
+# Route table constructors (Starlette) and aiohttp route definitions, e.g. web.post("/x", handler)
+UNSUPPORTED_ROUTE_CALLS = {"Route", "Mount", "WebSocketRoute", "Host"}
+
+# Django decorators that restrict a function view to fixed methods
+DJANGO_METHOD_DECORATORS = {"require_GET": ["GET"], "require_POST": ["POST"], "require_safe": ["GET"]}
+
+# FastAPI parameter helpers and the location they put the parameter in
+PARAM_HELPERS = {
+    "Query": "query",
+    "Path": "path",
+    "Header": "header",
+    "Cookie": "cookie",
+    "Body": "body",
+    "Form": "body",
+    "File": "body",
+}
+
+# Arguments injected by the framework that are not part of the API surface
+FRAMEWORK_ARGUMENTS = {
+    "Request", "Response", "BackgroundTasks", "WebSocket", "HTTPConnection", "Session", "AsyncSession",
+}
+
+SIMPLE_TYPES = {
+    "str": "string",
+    "int": "integer",
+    "float": "number",
+    "bool": "boolean",
+    "bytes": "string",
+    "dict": "object",
+    "Dict": "object",
+    "list": "array",
+    "List": "array",
+    "UUID": "string",
+    "date": "string",
+    "datetime": "string",
+    "UploadFile": "file",
+}
+
+JSON_TYPES = {"string", "integer", "number", "boolean", "array", "object"}
+
+AUTH_HINT = re.compile(r"auth|user|token|login|permission|security|oauth|jwt|api_?key|credential", re.IGNORECASE)
+
+FASTAPI_PATH_PARAM = re.compile(r"\{(\w+)(?::\w+)?\}")
+WERKZEUG_PATH_PARAM = re.compile(r"<(?:(\w+)(?:\([^)]*\))?:)?(\w+)>")
+
+CONVERTER_TYPES = {"int": "integer", "float": "number", "uuid": "string", "path": "string", "string": "string"}
+
+
+class UnsupportedRoute(Exception):
+    """Raised when a file registers routes that cannot be resolved statically"""
+
+
+def extract_static_endpoints(file_path, content):
+    """
+    Extract endpoints without a model call for the languages supported statically
+
+    Returns {"endpoints": [...]} or None when the file has to go to the model.
+    A file that yields no endpoints but still looks like it registers routes is
+    also left to the model, since it most likely uses a form the extractor
+    cannot read.
+    """
+    if os.path.splitext(file_path)[1].lower() == ".py":
+        result = extract_python_endpoints(content)
+        if result is not None and not result["endpoints"] and has_route_signature(file_path, content):
+            return None
+        return result
+    return None
+
+
+def extract_python_endpoints(content):
+    """
+    Extract FastAPI/Flask/Django endpoints from Python source with the ast module
+
+    The result has the same {"endpoints": [...]} shape as the model output. None
+    is returned when the file cannot be analysed exactly (syntax errors, route
+    paths that are not literals, frameworks this extractor does not know).
+    """
+    try:
+        tree = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return None
+
+    try:
+        return {"endpoints": PythonEndpointExtractor(tree).extract()}
+    except UnsupportedRoute:
+        return None
+
+
+def dotted_name(node):
+    """Return 'a.b.c' for Name/Attribute chains, or None"""
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else None
+    if isinstance(node, ast.Call):
+        return dotted_name(node.func)
+    return None
+
+
+def literal_string(node):
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def literal_strings(node):
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        values = [literal_string(element) for element in node.elts]
+        if all(value is not None for value in values):
+            return values
+    return None
+
+
+def keyword_value(call, name):
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+def join_paths(prefix, path):
+    if not prefix:
+        return path or "/"
+    return prefix.rstrip("/") + "/" + path.lstrip("/")
+
+
+def first_docstring_paragraph(function):
+    docstring = ast.get_docstring(function)
+    if not docstring:
+        return None
+    return " ".join(docstring.strip().split("\n\n")[0].split())
+
+
+class PythonEndpointExtractor:
+    def __init__(self, tree):
+        self.tree = tree
+        self.routers = {}
+        self.router_kinds = {}
+        self.models = {}
+        self.functions = {}
+        self.imports = set()
+
+    def extract(self):
+        self.check_imports()
+        self.collect_definitions()
+
+        endpoints = []
+        for node in ast.walk(self.tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for decorator in node.decorator_list:
+                    endpoints.extend(self.endpoints_from_decorator(node, decorator))
+            elif isinstance(node, ast.Call):
+                self.check_registration(node)
+                endpoints.extend(self.endpoints_from_registration(node))
+            elif isinstance(node, ast.Assign):
+                endpoints.extend(self.endpoints_from_urlpatterns(node))
+        return endpoints
+
+    def check_imports(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                self.imports.add(module.split(".")[0])
+                if module.split(".")[0] in UNSUPPORTED_FRAMEWORKS:
+                    raise UnsupportedRoute(module)
+
+    def check_registration(self, call):
+        """Raise for route registrations this extractor cannot resolve, rather than dropping their endpoints"""
+        name = dotted_name(call.func) or ""
+        if isinstance(call.func, ast.Attribute) and call.func.attr in UNSUPPORTED_REGISTRARS and call.args:
+            # register() is common outside routing (atexit, admin.site): only routers count
+            if call.func.attr != "register" or "router" in name.lower():
+                raise UnsupportedRoute(name)
+        if name.split(".")[-1] in UNSUPPORTED_ROUTE_CALLS and call.args:
+            raise UnsupportedRoute(name)
+        if "aiohttp" in self.imports and name.startswith("web.") and name[4:] in HTTP_METHODS | {"route", "view"}:
+            raise UnsupportedRoute(name)
+
+    def collect_definitions(self):
+        """Find router objects (with their prefixes), Pydantic-style models and functions"""
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Call):
+                factory = (dotted_name(node.value.func) or "").split(".")[-1]
+                if factory in ROUTER_FACTORIES:
+                    prefix_node = keyword_value(node.value, ROUTER_FACTORIES[factory]) if ROUTER_FACTORIES[factory] else None
+                    prefix = literal_string(prefix_node)
+                    if prefix is None and prefix_node is not None and not (
+                            isinstance(prefix_node, ast.Constant) and prefix_node.value is None):
+                        # A computed prefix (settings, f-string) changes every path of the router
+                        raise UnsupportedRoute(ast.unparse(prefix_node))
+                    for target in node.targets:
+                        name = dotted_name(target)
+                        if name:
+                            self.routers[name] = prefix or ""
+                            self.router_kinds[name] = factory
+            elif isinstance(node, ast.ClassDef):
+                self.models[node.name] = {
+                    statement.target.id: self.annotation_type(statement.annotation)
+                    for statement in node.body
+                    if isinstance(statement, ast.AnnAssign) and isinstance(statement.target, ast.Name)
+                }
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions.setdefault(node.name, node)
+
+    def route_call(self, decorator):
+        """Split a decorator/call into (router name, registrar name) if it looks like a route"""
+        if not isinstance(decorator, ast.Call) or not isinstance(decorator.func, ast.Attribute):
+            return None, None
+        registrar = decorator.func.attr
+        if registrar not in HTTP_METHODS | ROUTE_REGISTRARS:
+            return None, None
+        return dotted_name(decorator.func.value), registrar
+
+    def route_path(self, call, router, keywords=("path", "rule")):
+        node = call.args[0] if call.args else next(
+            (keyword_value(call, name) for name in keywords if keyword_value(call, name) is not None), None
+        )
+        path = literal_string(node)
+        if path is None:
+            if node is not None:
+                # A computed path, on a local or imported router: only the model can guess it
+                raise UnsupportedRoute(ast.unparse(node))
+            return None
+        if router not in self.routers and not path.startswith("/"):
+            # e.g. dict.get("key") or cache.get("/...")-like calls on unknown objects
+            return None
+        return path
+
+    def endpoints_from_decorator(self, function, decorator):
+        router, registrar = self.route_call(decorator)
+        if registrar is None:
+            return []
+
+        path = self.route_path(decorator, router)
+        if path is None:
+            return []
+
+        if registrar in HTTP_METHODS:
+            methods = [registrar.upper()]
+        else:
+            methods_node = keyword_value(decorator, "methods")
+            methods = literal_strings(methods_node) if methods_node is not None else ["GET"]
+            if methods is None:
+                raise UnsupportedRoute(ast.unparse(methods_node))
+            methods = [method.upper() for method in methods]
+
+        full_path = join_paths(self.routers.get(router, ""), path)
+        return [
+            self.build_endpoint(full_path, method, function, decorator, self.uses_signature(router))
+            for method in methods
+            if method not in ("HEAD", "OPTIONS") or len(methods) == 1
+        ]
+
+    def endpoints_from_registration(self, call):
+        """app.add_url_rule("/x", view_func=f) / router.add_api_route("/x", f, methods=[...])"""
+        if not isinstance(call.func, ast.Attribute) or call.func.attr not in ("add_url_rule", "add_api_route"):
+            return []
+        router = dotted_name(call.func.value)
+        path = self.route_path(call, router)
+        if path is None:
+            return []
+
+        view_node = keyword_value(call, "view_func") or keyword_value(call, "endpoint")
+        if view_node is None and len(call.args) > (2 if call.func.attr == "add_url_rule" else 1):
+            view_node = call.args[2 if call.func.attr == "add_url_rule" else 1]
+        function = self.functions.get((dotted_name(view_node) or "").split(".")[-1])
+
+        methods_node = keyword_value(call, "methods")
+        methods = literal_strings(methods_node) if methods_node is not None else ["GET"]
+        if methods is None:
+            raise UnsupportedRoute(ast.unparse(methods_node))
+
+        full_path = join_paths(self.routers.get(router, ""), path)
+        return [self.build_endpoint(full_path, method.upper(), function, call, self.uses_signature(router))
+                for method in methods]
+
+    def endpoints_from_urlpatterns(self, assign):
+        """
+        Django: urlpatterns = [path("items/<int:pk>/", views.detail), ...]
+
+        Class-based views (as_view()) dispatch on their methods and are left to
+        the model. Function views get the methods of their @require_http_methods,
+        @require_GET/POST/safe or @api_view decorator when defined in this file;
+        otherwise they are reported as GET only.
+        """
+        if not any(isinstance(target, ast.Name) and target.id == "urlpatterns" for target in assign.targets):
+            return []
+        if not isinstance(assign.value, (ast.List, ast.Tuple)):
+            raise UnsupportedRoute("urlpatterns")
+
+        endpoints = []
+        for element in assign.value.elts:
+            if not isinstance(element, ast.Call):
+                raise UnsupportedRoute(ast.unparse(element))
+            helper = (dotted_name(element.func) or "").split(".")[-1]
+            if helper not in ("path", "re_path", "url") or len(element.args) < 2:
+                raise UnsupportedRoute(ast.unparse(element))
+            route = literal_string(element.args[0])
+            if route is None:
+                raise UnsupportedRoute(ast.unparse(element.args[0]))
+            view = element.args[1]
+            if isinstance(view, ast.Call) and (dotted_name(view.func) or "").endswith("include"):
+                # Included URL configurations are documented from their own module
+                continue
+            if helper != "path":
+                route = re.sub(r"\(\?P<(\w+)>[^)]*\)", r"<\1>", route).strip("^$")
+
+            if isinstance(view, ast.Call) and isinstance(view.func, ast.Attribute) and view.func.attr == "as_view":
+                raise UnsupportedRoute(ast.unparse(view))
+
+            view_name = dotted_name(view) or ast.unparse(view)
+            function = self.functions.get(view_name.split(".")[-1])
+            for method in self.django_view_methods(function):
+                endpoint = self.build_endpoint("/" + route.lstrip("/"), method, function, element, False)
+                if function is None:
+                    endpoint["description"] = f"Handled by Django view {view_name}"
+                endpoints.append(endpoint)
+        return endpoints
+
+    def django_view_methods(self, function):
+        """Methods a function view accepts according to its decorators, GET when they do not say"""
+        for decorator in function.decorator_list if function is not None else []:
+            name = (dotted_name(decorator) or "").split(".")[-1]
+            if name in DJANGO_METHOD_DECORATORS:
+                return DJANGO_METHOD_DECORATORS[name]
+            if name in ("require_http_methods", "api_view") and isinstance(decorator, ast.Call) and decorator.args:
+                methods = literal_strings(decorator.args[0])
+                if methods is None:
+                    raise UnsupportedRoute(ast.unparse(decorator))
+                return [method.upper() for method in methods]
+        return ["GET"]
+
+    def uses_signature(self, router):
+        """Whether handler arguments are request parameters (FastAPI) or only path values (Flask, aiohttp)"""
+        if router in self.router_kinds:
+            return self.router_kinds[router] in SIGNATURE_ROUTERS
+        # Router imported from another module: decide from the framework imported here
+        return "fastapi" in self.imports or not self.imports & {"flask", "aiohttp", "django"}
+
+    def annotation_type(self, annotation):
+        """Map an annotation to a JSON type name, keeping model names as-is"""
+        if annotation is None:
+            return "string"
+        if isinstance(annotation, ast.Constant) and isinstance(annotation.value, str):
+            return SIMPLE_TYPES.get(annotation.value, annotation.value)
+        if isinstance(annotation, ast.Subscript):
+            container = dotted_name(annotation.value) or ""
+            inner = annotation.slice
+            if container.split(".")[-1] in ("Optional", "Annotated"):
+                first = inner.elts[0] if isinstance(inner, ast.Tuple) else inner
+                return self.annotation_type(first)
+            if container.split(".")[-1] == "Union" and isinstance(inner, ast.Tuple):
+                return self.annotation_type(inner.elts[0])
+            return SIMPLE_TYPES.get(container.split(".")[-1], "object")
+        if isinstance(annotation, ast.BinOp):
+            # X | None
+            return self.annotation_type(annotation.left)
+        name = (dotted_name(annotation) or "").split(".")[-1]
+        return SIMPLE_TYPES.get(name, name or "string")
+
+    def build_endpoint(self, path, method, function, route_node, signature_params):
+        """Build one endpoint dict from the route path and the handler's signature"""
+        parameters = []
+        authentication = []
+        seen = set()
+
+        def add_parameter(name, location, type_name, required=True, schema=None):
+            if (name, location) in seen:
+                return
+            seen.add((name, location))
+            parameter = {"name": name, "in": location, "type": type_name, "required": required}
+            if schema is not None:
+                parameter["schema"] = schema
+            parameters.append(parameter)
+
+        path_types = {}
+        for converter, name in WERKZEUG_PATH_PARAM.findall(path):
+            path_types[name] = CONVERTER_TYPES.get(converter, "string")
+        path = WERKZEUG_PATH_PARAM.sub(r"{\2}", path)
+        path_params = FASTAPI_PATH_PARAM.findall(path)
+        path = FASTAPI_PATH_PARAM.sub(r"{\1}", path)
+
+        arguments = {}
+        if function is not None:
+            args = function.args
+            positional = args.posonlyargs + args.args
+            defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+            for arg, default in list(zip(positional, defaults)) + list(zip(args.kwonlyargs, args.kw_defaults)):
+                if arg.arg not in ("self", "cls"):
+                    arguments[arg.arg] = (arg.annotation, default)
+
+        for name in path_params:
+            annotation = arguments.get(name, (None, None))[0]
+            type_name = path_types.get(name) or (self.annotation_type(annotation) if annotation is not None else "string")
+            add_parameter(name, "path", type_name)
+
+        for name, (annotation, default) in arguments.items():
+            if name in path_params or not signature_params:
+                continue
+
+            # Annotated[T, Depends(...)] / Annotated[T, Query()]
+            marker = default
+            if isinstance(annotation, ast.Subscript) and (dotted_name(annotation.value) or "").endswith("Annotated"):
+                elements = annotation.slice.elts if isinstance(annotation.slice, ast.Tuple) else [annotation.slice]
+                marker = next((element for element in elements[1:] if isinstance(element, ast.Call)), default)
+
+            helper = (dotted_name(marker) or "").split(".")[-1] if isinstance(marker, ast.Call) else None
+            type_name = self.annotation_type(annotation)
+
+            if helper in ("Depends", "Security"):
+                dependency = dotted_name(marker.args[0]) if marker.args else type_name
+                if helper == "Security" or AUTH_HINT.search(dependency or ""):
+                    authentication.append(f"{helper}({dependency})")
+                continue
+            if type_name in FRAMEWORK_ARGUMENTS:
+                continue
+
+            has_default = default is not None and not (
+                isinstance(marker, ast.Call) and marker.args and isinstance(marker.args[0], ast.Constant)
+                and marker.args[0].value is Ellipsis
+            )
+            if helper in PARAM_HELPERS:
+                location = PARAM_HELPERS[helper]
+            elif type_name in self.models or type_name in ("object", "file") or type_name not in JSON_TYPES:
+                # Pydantic models (possibly imported from another module), dicts and uploads
+                location = "body"
+            else:
+                location = "query"
+
+            schema = self.models.get(type_name) if location == "body" else None
+            add_parameter(name, location, "object" if schema is not None else type_name,
+                          required=not has_default, schema=schema)
+
+        if function is not None:
+            for location, name in self.request_accesses(function):
+                add_parameter(name, location, "string", required=False)
+            for decorator in function.decorator_list:
+                decorator_name = dotted_name(decorator) or ""
+                if decorator is not route_node and AUTH_HINT.search(decorator_name):
+                    authentication.append(f"@{decorator_name}")
+
+        if function is not None:
+            description = first_docstring_paragraph(function) or function.name.replace("_", " ").capitalize()
+        else:
+            description = f"{method} {path}"
+
+        endpoint = {
+            "path": path,
+            "method": method,
+            "parameters": parameters,
+            "description": description,
+            "authentication": ", ".join(authentication),
+        }
+
+        if isinstance(route_node, ast.Call):
+            status_code = keyword_value(route_node, "status_code")
+            response_model = keyword_value(route_node, "response_model")
+            code = str(status_code.value) if isinstance(status_code, ast.Constant) else "200"
+            response = {"description": "Successful response"}
+            if response_model is not None:
+                response["schema"] = self.annotation_type(response_model)
+            endpoint["response"] = {code: response}
+
+        return endpoint
+
+    def request_accesses(self, function):
+        """Flask-style request.args/form/json lookups with literal keys"""
+        locations = {"args": "query", "form": "body", "json": "body", "files": "body", "headers": "header", "cookies": "cookie"}
+        found = []
+        for node in ast.walk(function):
+            target, key = None, None
+            if isinstance(node, ast.Subscript):
+                target, key = node.value, literal_string(node.slice)
+            elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                  and node.func.attr == "get" and node.args):
+                target, key = node.func.value, literal_string(node.args[0])
+            if key is None or not isinstance(target, ast.Attribute):
+                continue
+            if dotted_name(target.value) == "request" and target.attr in locations:
+                found.append((locations[target.attr], key))
+        return found
@@ -0,0 +1,117 @@
+"""
+Generation worker processes
+
+Run from the repository root, next to the API server:
+
+    python backend/worker.py --workers 4
+
+Each process leases queued jobs from backend/database/jobs.db, runs them and
+keeps its lease alive with heartbeats. A job whose worker dies is picked up
+again by another worker once its lease expires.
+
+Each process runs one job at a time with its own model limiter, capped at an
+even share of OLLAMA_MAX_CONCURRENCY per backend. Fair queuing between owners
+and repositories only applies inside a process. Across workers, jobs are
+taken oldest first.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from routes.assistant import async_main, share_capacity
+from database_models.job_store import claim_job, heartbeat_job, finish_job, supersede_job
+from database_models.token_store import read_token
+from utils.scheduler import Superseded
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 60))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+
+
+async def keep_leased(job, worker_id, superseded):
+    """Renew the lease until cancelled; signal the run to stop when it was superseded or the lease was lost"""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        leased, newer = await asyncio.to_thread(heartbeat_job, job["id"], worker_id, JOB_LEASE_SECONDS)
+        if not leased:
+            print(f"[{worker_id}] Lost the lease of job {job['id']}")
+        if newer or not leased:
+            superseded.set()
+
+
+async def run_job(job, worker_id):
+    token = read_token(job["owner_id"])
+    if token is None:
+        finish_job(job["id"], worker_id, "failed", {"Message": "Token not found"})
+        print(f"[{worker_id}] Job {job['id']} failed: token not found for user {job['owner_id']}")
+        return
+
+    superseded = asyncio.Event()
+    heartbeat = asyncio.ensure_future(keep_leased(job, worker_id, superseded))
+    try:
+        result = await async_main({
+            "owner": job["owner"],
+            "owner_id": job["owner_id"],
+            "repo": job["repo"],
+            "token": token.token,
+            "branch": job["branch"],
+            "ref": job["ref"],
+            "changes": job["changes"],
+            "superseded": superseded,
+        })
+        finish_job(job["id"], worker_id, "done", result)
+        print(f"[{worker_id}] Job {job['id']} completed: {result}")
+    except Superseded:
+        supersede_job(job["id"], worker_id)
+        print(f"[{worker_id}] Job {job['id']} superseded by a newer push")
+    except Exception as e:
+        finish_job(job["id"], worker_id, "failed", {"Message": str(e)})
+        print(f"[{worker_id}] Job {job['id']} failed: {e}")
+    finally:
+        heartbeat.cancel()
+
+
+async def work(worker_id):
+    print(f"[{worker_id}] Waiting for jobs")
+    while True:
+        job = await asyncio.to_thread(claim_job, worker_id, JOB_LEASE_SECONDS)
+        if job is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        print(f"[{worker_id}] Running job {job['id']} for {job['owner']}/{job['repo']}@{job['branch']} "
+              f"(attempt {job['attempts']})")
+        await run_job(job, worker_id)
+
+
+def start_worker(index, workers):
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    share_capacity(workers)
+    try:
+        asyncio.run(work(worker_id))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run documentation generation workers")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("GENERATION_WORKERS", 1)),
+                        help="number of worker processes")
+    args = parser.parse_args()
+
+    if args.workers <= 1:
+        start_worker(0, 1)
+    else:
+        processes = [multiprocessing.Process(target=start_worker, args=(index, args.workers)) for index in range(args.workers)]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+                process.join()
@@ -24,45 +24,106 @@ const customStyles = {
     }
 };
 
-const TreeView = ({ data }) => {
+const fetchSubtree = async (repoId, path, offset = 0) => {
+    const tokenInfo = localStorage.getItem('tokenInfo');
+    if (!tokenInfo) {
+        throw new Error('No authentication token found');
+    }
+
+    const params = new URLSearchParams({ path, depth: 1, offset });
+    const response = await fetch(`http://localhost:8000/api/repo/${repoId}/tree?${params}`, {
+        method: 'GET',
+        headers: {
+            'Authorization': `Bearer ${JSON.parse(tokenInfo).access_token}`,
+            'Accept': 'application/json'
+        }
+    });
+
+    if (!response.ok) {
+        throw new Error('Failed to fetch directory contents');
+    }
+    return response.json();
+};
+
+const TreeView = ({ data, repoId }) => {
     const [expanded, setExpanded] = useState({});
+    // Directory contents fetched on first expand, by path
+    const [loaded, setLoaded] = useState({});
+    const [loading, setLoading] = useState({});
+
+    const loadChildren = async (path, offset = 0) => {
+        setLoading(prev => ({ ...prev, [path]: true }));
+        try {
+            const page = await fetchSubtree(repoId, path, offset);
+            setLoaded(prev => ({
+                ...prev,
+                [path]: {
+                    items: [...(offset && prev[path] ? prev[path].items : []), ...page.items],
+                    total: page.total
+                }
+            }));
+        } catch (error) {
+            console.error('Error fetching directory contents:', error);
+            toast.error('Failed to fetch directory contents');
+        } finally {
+            setLoading(prev => ({ ...prev, [path]: false }));
+        }
+    };
 
-    const toggleDir = (path) => {
+    const toggleDir = (item) => {
+        if (!expanded[item.path] && !item.children && item.has_children && !loaded[item.path]) {
+            loadChildren(item.path);
+        }
         setExpanded(prev => ({
             ...prev,
-            [path]: !prev[path]
+            [item.path]: !prev[item.path]
         }));
     };
 
     const renderTree = (items) => {
-        return items.map(item => (
-            <div key={item.path} className="ml-4">
-                {item.type === 'directory' ? (
-                    <div>
-                        <div
-                            onClick={() => toggleDir(item.path)}
-                            className="flex items-center gap-2 py-1 hover:bg-gray-50 cursor-pointer text-sm group"
-                        >
-                            <div className={`transform transition-transform duration-200 ${expanded[item.path] ? 'rotate-90' : ''}`}>
-                                <ChevronRight size={16} />
+        return items.map(item => {
+            const children = item.children || loaded[item.path]?.items || [];
+            const total = loaded[item.path]?.total ?? children.length;
+
+            return (
+                <div key={item.path} className="ml-4">
+                    {item.type === 'directory' ? (
+                        <div>
+                            <div
+                                onClick={() => toggleDir(item)}
+                                className="flex items-center gap-2 py-1 hover:bg-gray-50 cursor-pointer text-sm group"
+                            >
+                                <div className={`transform transition-transform duration-200 ${expanded[item.path] ? 'rotate-90' : ''}`}>
+                                    <ChevronRight size={16} />
+                                </div>
+                                <Folder size={16} className="text-blue-500" />
+                                <span>{item.name}</span>
+                                {loading[item.path] && <Loader2 size={14} className="animate-spin text-gray-400" />}
                             </div>
-                            <Folder size={16} className="text-blue-500" />
-                            <span>{item.name}</span>
-                        </div>
-                        <div className={`overflow-hidden transition-all duration-200 ${expanded[item.path] ? 'max-h-[1000px] opacity-100' : 'max-h-0 opacity-0'}`}>
-                            <div className="ml-2 border-l border-gray-200">
-                                {renderTree(item.children)}
+                            <div className={`overflow-hidden transition-all duration-200 ${expanded[item.path] ? 'max-h-[1000px] opacity-100' : 'max-h-0 opacity-0'}`}>
+                                <div className="ml-2 border-l border-gray-200">
+                                    {expanded[item.path] && renderTree(children)}
+                                    {expanded[item.path] && children.length < total && (
+                                        <button
+                                            onClick={() => loadChildren(item.path, children.length)}
+                                            disabled={loading[item.path]}
+                                            className="ml-10 py-1 text-sm text-indigo-600 hover:underline"
+                                        >
+                                            Show {total - children.length} more
+                                        </button>
+                                    )}
+                                </div>
                             </div>
                         </div>
-                    </div>
-                ) : (
-                    <div className="flex items-center gap-2 py-1 pl-6 text-sm text-gray-600">
-                        <FileIcon size={16} className="text-gray-400" />
-                        <span>{item.name}</span>
-                    </div>
-                )}
-            </div>
-        ));
+                    ) : (
+                        <div className="flex items-center gap-2 py-1 pl-6 text-sm text-gray-600">
+                            <FileIcon size={16} className="text-gray-400" />
+                            <span>{item.name}</span>
+                        </div>
+                    )}
+                </div>
+            );
+        });
     };
 
     return renderTree(data);
@@ -433,7 +494,7 @@ export default function RepositoryDetails() {
                                 <div className="flex-1">
                                     <h3 className="text-sm font-medium text-gray-700 mb-4">Directory Structure</h3>
                                     <div className="border rounded-lg p-4 bg-gray-50">
-                                        <TreeView data={repoDetails.directory_structure} />
+                                        <TreeView data={repoDetails.directory_structure} repoId={id} />
                                     </div>
                                 </div>
                             </div>